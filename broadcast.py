@@ -0,0 +1,128 @@
+"""Fan-out sends through existing broadcast lists and groups.
+
+Sending the same message to thousands of contacts one chat at a time costs
+a navigation, compose, attach and verify per contact. When a campaign has
+no per-contact content, a broadcast list (up to 256 members) or a group
+(up to 1024) reaches all of its members with one send. WhatsApp Web cannot
+create broadcast lists, so targets are lists and groups that already exist
+in the account, opened by name, with their members given in the campaign
+so every recipient still gets its own row in the results.
+
+The page does not show which numbers a list or group really reaches (a
+broadcast only reaches members who saved the sender's number), so members
+are recorded as STATUS_UNCONFIRMED and not remembered as contacted.
+Membership is taken on trust: anyone in the list or group but not in the
+campaign gets the message too.
+
+A target is only used when every listed member is still due a message: if
+any was suppressed (opted out, already contacted), the target's remaining
+members are sent to one by one instead, as they are when the target's chat
+cannot be found.
+"""
+from collections import namedtuple
+
+STATUS_UNCONFIRMED = "Unconfirmed"
+
+TARGET_BROADCAST = "broadcast"
+TARGET_GROUP = "group"
+
+# Members WhatsApp allows per broadcast list / group
+MAX_MEMBERS = {
+    TARGET_BROADCAST: 256,
+    TARGET_GROUP: 1024,
+}
+
+TARGET_LABELS = {
+    TARGET_BROADCAST: "broadcast list",
+    TARGET_GROUP: "group",
+}
+
+SEARCH_BOX_XPATH = '//div[@id="side"]//div[@contenteditable="true" and @role="textbox"]'
+
+FanoutPlan = namedtuple("FanoutPlan", "items targets fallbacks")
+
+
+class TargetNotFoundError(Exception):
+    pass
+
+
+def xpath_literal(value):
+    """Quotes `value` as an XPath 1.0 string literal (names may contain quotes)."""
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return "concat(" + ", '\"', ".join(f'"{part}"' for part in value.split('"')) + ")"
+
+
+def search_result_xpath(name):
+    return f'//div[@id="pane-side"]//span[@title={xpath_literal(name)}]'
+
+
+def chat_header_xpath(name):
+    return f'//div[@id="main"]//header//span[@title={xpath_literal(name)}]'
+
+
+class FanoutTarget:
+    """An existing broadcast list or group and the numbers it reaches."""
+
+    def __init__(self, kind, name, members):
+        if kind not in MAX_MEMBERS:
+            raise ValueError(f"Unknown fan-out type: {kind!r} (expected {' or '.join(MAX_MEMBERS)})")
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"A {TARGET_LABELS[kind]} needs a name")
+        self.kind = kind
+        self.name = name.strip()
+        self.members = []
+        for member in members:
+            member = str(member).strip()
+            if member and member not in self.members:
+                self.members.append(member)
+        if not self.members:
+            raise ValueError(f"{self} has no members")
+        if len(self.members) > MAX_MEMBERS[kind]:
+            raise ValueError(f"{self} has {len(self.members)} members; WhatsApp allows {MAX_MEMBERS[kind]}")
+
+    @classmethod
+    def from_dict(cls, spec):
+        if not isinstance(spec, dict) or not isinstance(spec.get("members"), list):
+            raise ValueError(f"Invalid fan-out target: {spec!r} (expected type, name and a list of members)")
+        try:
+            return cls(spec.get("type", TARGET_BROADCAST), spec["name"], spec["members"])
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(f"Invalid fan-out target: {spec!r} (expected type, name and a list of members)")
+
+    def __len__(self):
+        return len(self.members)
+
+    def __str__(self):
+        return f"{TARGET_LABELS[self.kind]} '{self.name}'"
+
+
+def validate_targets(targets):
+    """Raises ValueError when a number is in two targets (it would get the message twice)."""
+    owner = {}
+    for target in targets:
+        for member in target.members:
+            if member in owner:
+                raise ValueError(f"{member} is in both {owner[member]} and {target}")
+            owner[member] = target
+
+
+def plan_fanout(numbers, targets):
+    """Splits the numbers due a message into fan-out targets and single contacts.
+
+    Returns FanoutPlan(items, targets, fallbacks): items are the targets that
+    can be used followed by the remaining numbers in their original order;
+    fallbacks are the targets skipped because a member is not in `numbers`.
+    """
+    remaining = set(numbers)
+    used, fallbacks = [], []
+    for target in targets:
+        if all(member in remaining for member in target.members):
+            used.append(target)
+            remaining.difference_update(target.members)
+        else:
+            fallbacks.append(target)
+    singles = [number for number in numbers if number in remaining]
+    return FanoutPlan(used + singles, used, fallbacks)
@@ -0,0 +1,632 @@
+"""Durable campaign queue shared by worker processes.
+
+The coordinator keeps campaigns and their contacts in a SQLite file. Workers
+(one WhatsApp Web session each) lease small batches of contacts, heartbeat
+while they send and report one result per contact. A lease that is not
+renewed expires and its unfinished contacts go back to the queue, so a hung
+driver or a crashed browser only costs that worker's current batch.
+
+Workers on the same host can open the SQLite file directly; workers on other
+hosts talk to `python campaign_queue.py serve` over TCP.
+
+Usage:
+    python campaign_queue.py add campaign.json --queue queue.db
+    python campaign_queue.py serve --queue queue.db --host 0.0.0.0 --token SECRET
+    python campaign_queue.py worker --queue tcp://coordinator:8765 --token SECRET
+    python campaign_queue.py supervise --queue queue.db --workers 3
+    python campaign_queue.py status 1 --queue queue.db
+"""
+import sys
+import os
+import json
+import time
+import uuid
+import hmac
+import socket
+import signal
+import sqlite3
+import logging
+import argparse
+import threading
+import subprocess
+import socketserver
+from sender_core import CampaignSender, SenderEvents
+from session_watchdog import SessionUnrecoverable, LoginRequired
+from suppression import SuppressionIndex
+from timeouts import AdaptiveTimeouts
+from cli import (
+    load_campaign, CampaignError, add_logging_args, configure_logging,
+    EXIT_USAGE, EXIT_LOGIN_REQUIRED, EXIT_ERROR
+)
+
+# Contact states in the queue; finished contacts carry the sender's result status
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_PORT = 8765
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    message TEXT NOT NULL,
+    attached_file TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(id),
+    number TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    reason TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_id TEXT,
+    worker TEXT,
+    lease_expires REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS contacts_by_status ON contacts(status, campaign_id, id);
+CREATE INDEX IF NOT EXISTS contacts_by_lease ON contacts(lease_id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    last_seen REAL
+);
+"""
+
+
+# ------------------- SQLite Queue -------------------
+class CampaignQueue:
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _transaction(self, work):
+        # BEGIN IMMEDIATE takes the write lock up front so two processes can
+        # never lease the same contacts.
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.conn)
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def add_campaign(self, numbers, message, attached_file=None, name=None):
+        def work(conn):
+            cursor = conn.execute(
+                "INSERT INTO campaigns (name, message, attached_file, created_at) VALUES (?, ?, ?, ?)",
+                (name, message, attached_file, time.time())
+            )
+            campaign_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO contacts (campaign_id, number) VALUES (?, ?)",
+                ((campaign_id, number) for number in numbers)
+            )
+            return campaign_id
+        return self._transaction(work)
+
+    def lease(self, worker_id, batch_size=DEFAULT_BATCH_SIZE, lease_seconds=DEFAULT_LEASE_SECONDS,
+              exclude_campaigns=()):
+        """Leases up to batch_size pending contacts of one campaign.
+
+        Campaigns in exclude_campaigns are left to other workers. Returns
+        None when there is no work, otherwise a dict with the lease id, its
+        expiry, the campaign and a list of [contact_id, number].
+        """
+        exclude_campaigns = [int(campaign_id) for campaign_id in exclude_campaigns]
+
+        def work(conn):
+            now = time.time()
+            self._reclaim_expired(conn, now)
+            self._touch_worker(conn, worker_id, now)
+            row = conn.execute(
+                "SELECT campaign_id FROM contacts WHERE status = ? "
+                f"AND campaign_id NOT IN ({', '.join('?' * len(exclude_campaigns))}) "
+                "ORDER BY campaign_id, id LIMIT 1",
+                (STATUS_PENDING, *exclude_campaigns)
+            ).fetchone()
+            if row is None:
+                return None
+            campaign_id = row[0]
+            contacts = conn.execute(
+                "SELECT id, number FROM contacts WHERE status = ? AND campaign_id = ? ORDER BY id LIMIT ?",
+                (STATUS_PENDING, campaign_id, batch_size)
+            ).fetchall()
+            lease_id = uuid.uuid4().hex
+            expires = now + lease_seconds
+            conn.executemany(
+                "UPDATE contacts SET status = ?, lease_id = ?, worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                ((STATUS_LEASED, lease_id, worker_id, expires, now, contact_id) for contact_id, _ in contacts)
+            )
+            name, message, attached_file = conn.execute(
+                "SELECT name, message, attached_file FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+            return {
+                "lease_id": lease_id,
+                "expires": expires,
+                "campaign": {"id": campaign_id, "name": name, "message": message, "attached_file": attached_file},
+                "contacts": [[contact_id, number] for contact_id, number in contacts]
+            }
+        return self._transaction(work)
+
+    def _reclaim_expired(self, conn, now):
+        reclaimed = conn.execute(
+            "UPDATE contacts SET status = ?, lease_id = NULL, worker = NULL, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ?",
+            (STATUS_PENDING, STATUS_LEASED, now)
+        ).rowcount
+        if reclaimed:
+            logging.warning(f"Reclaimed {reclaimed} contacts from expired leases")
+        # A contact that keeps outliving its leases is probably what kills the
+        # workers; stop handing it out.
+        conn.execute(
+            "UPDATE contacts SET status = 'Failed', reason = ?, updated_at = ? WHERE status = ? AND attempts >= ?",
+            ("Abandoned after repeated worker loss", now, STATUS_PENDING, self.max_attempts)
+        )
+
+    def _touch_worker(self, conn, worker_id, now):
+        conn.execute(
+            "INSERT INTO workers (id, host, last_seen) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen",
+            (worker_id, worker_id.split(":")[0], now)
+        )
+
+    def heartbeat(self, lease_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extends a lease; returns False if it already expired and was reclaimed."""
+        def work(conn):
+            now = time.time()
+            self._touch_worker(conn, worker_id, now)
+            return conn.execute(
+                "UPDATE contacts SET lease_expires = ? WHERE lease_id = ? AND status = ?",
+                (now + lease_seconds, lease_id, STATUS_LEASED)
+            ).rowcount > 0
+        return self._transaction(work)
+
+    def complete(self, lease_id, contact_id, status, reason=""):
+        """Stores a contact result.
+
+        Results from a lease that expired are still accepted as long as no
+        other worker has picked the contact up, so a late success is not
+        sent a second time.
+        """
+        def work(conn):
+            return conn.execute(
+                "UPDATE contacts SET status = ?, reason = ?, lease_id = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND (lease_id = ? OR status = ?)",
+                (status, reason, time.time(), contact_id, lease_id, STATUS_PENDING)
+            ).rowcount > 0
+        return self._transaction(work)
+
+    def release(self, lease_id):
+        """Returns the unfinished contacts of a lease to the queue."""
+        def work(conn):
+            return conn.execute(
+                "UPDATE contacts SET status = ?, lease_id = NULL, worker = NULL, lease_expires = NULL, "
+                "attempts = attempts - 1 WHERE lease_id = ? AND status = ?",
+                (STATUS_PENDING, lease_id, STATUS_LEASED)
+            ).rowcount
+        return self._transaction(work)
+
+    def campaign_status(self, campaign_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM contacts WHERE campaign_id = ? GROUP BY status", (campaign_id,)
+            ).fetchall()
+        counts = dict(rows)
+        counts["total"] = sum(count for _, count in rows)
+        return counts
+
+    def campaign_results(self, campaign_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT number, status, reason, worker, attempts FROM contacts WHERE campaign_id = ? ORDER BY id",
+                (campaign_id,)
+            ).fetchall()
+        return [
+            {"number": number, "status": status, "reason": reason, "worker": worker, "attempts": attempts}
+            for number, status, reason, worker, attempts in rows
+        ]
+
+    def list_campaigns(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT id, name, created_at FROM campaigns ORDER BY id").fetchall()
+        return [{"id": campaign_id, "name": name, "created_at": created_at} for campaign_id, name, created_at in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------- TCP Coordinator -------------------
+QUEUE_OPERATIONS = (
+    "add_campaign", "lease", "heartbeat", "complete", "release",
+    "campaign_status", "campaign_results", "list_campaigns"
+)
+
+
+class QueueRequestHandler(socketserver.StreamRequestHandler):
+    """Serves one JSON object per line: {"token", "op", "args"} -> {"ok", "result"|"error"}."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not hmac.compare_digest(str(request.get("token", "")), self.server.token):
+                    raise PermissionError("Invalid token")
+                op = request.get("op")
+                if op not in QUEUE_OPERATIONS:
+                    raise ValueError(f"Unknown operation: {op}")
+                result = getattr(self.server.queue, op)(**request.get("args", {}))
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class QueueServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue, host, port, token):
+        super().__init__((host, port), QueueRequestHandler)
+        self.queue = queue
+        self.token = token
+
+
+class RemoteQueue:
+    """Client for QueueServer with the same interface as CampaignQueue."""
+
+    def __init__(self, host, port, token, timeout=30):
+        self.address = (host, port)
+        self.token = token
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _call(self, op, **args):
+        payload = (json.dumps({"token": self.token, "op": op, "args": args}) + "\n").encode("utf-8")
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                        self._file = self._sock.makefile("rb")
+                    self._sock.sendall(payload)
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("Coordinator closed the connection")
+                    break
+                except OSError:
+                    self.close()
+                    if attempt:
+                        raise
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def add_campaign(self, numbers, message, attached_file=None, name=None):
+        return self._call("add_campaign", numbers=numbers, message=message, attached_file=attached_file, name=name)
+
+    def lease(self, worker_id, batch_size=DEFAULT_BATCH_SIZE, lease_seconds=DEFAULT_LEASE_SECONDS,
+              exclude_campaigns=()):
+        return self._call("lease", worker_id=worker_id, batch_size=batch_size, lease_seconds=lease_seconds,
+                          exclude_campaigns=list(exclude_campaigns))
+
+    def heartbeat(self, lease_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        return self._call("heartbeat", lease_id=lease_id, worker_id=worker_id, lease_seconds=lease_seconds)
+
+    def complete(self, lease_id, contact_id, status, reason=""):
+        return self._call("complete", lease_id=lease_id, contact_id=contact_id, status=status, reason=reason)
+
+    def release(self, lease_id):
+        return self._call("release", lease_id=lease_id)
+
+    def campaign_status(self, campaign_id):
+        return self._call("campaign_status", campaign_id=campaign_id)
+
+    def campaign_results(self, campaign_id):
+        return self._call("campaign_results", campaign_id=campaign_id)
+
+    def list_campaigns(self):
+        return self._call("list_campaigns")
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+
+def open_queue(spec, token=""):
+    """Opens a local SQLite queue, or a remote one for tcp://host:port specs."""
+    if spec.startswith("tcp://"):
+        host, _, port = spec[len("tcp://"):].rpartition(":")
+        return RemoteQueue(host, int(port), token)
+    return CampaignQueue(spec)
+
+
+# ------------------- Worker -------------------
+class QueueWorker:
+    """Owns one WhatsApp Web session and sends the batches it leases."""
+
+    def __init__(self, queue, worker_id, sender, batch_size=DEFAULT_BATCH_SIZE,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, idle_sleep=5, exit_when_idle=False):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.sender = sender
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.idle_sleep = idle_sleep
+        self.exit_when_idle = exit_when_idle
+        self.stop_requested = False
+        # Campaigns whose attachment this host cannot send, left to other workers
+        self.skipped_campaigns = set()
+
+    def run(self):
+        """Returns a process exit code; non-zero means the session is unusable."""
+        if not self.sender.open_session():
+            logging.error(f"Worker {self.worker_id}: WhatsApp Web login required")
+            self.sender.close_session()
+            return EXIT_LOGIN_REQUIRED
+        self.sender.start_watchdog()
+        try:
+            while not self.stop_requested:
+                lease = self.queue.lease(self.worker_id, self.batch_size, self.lease_seconds,
+                                         self.skipped_campaigns)
+                if lease is None:
+                    if self.exit_when_idle:
+                        return 0
+                    time.sleep(self.idle_sleep)
+                    continue
+                self._process_lease(lease)
+            return 0
+        except LoginRequired as e:
+            logging.error(f"Worker {self.worker_id}: {e}")
+            return EXIT_LOGIN_REQUIRED
+        except SessionUnrecoverable as e:
+            logging.error(f"Worker {self.worker_id}: {e}")
+            return EXIT_ERROR
+        finally:
+            self.sender.close_session()
+            if self.sender.suppression is not None:
+                self.sender.suppression.close()
+
+    def _process_lease(self, lease):
+        lease_id = lease["lease_id"]
+        campaign = lease["campaign"]
+        self.sender.log.extra["campaign"] = campaign["id"]
+        logging.info(f"Worker {self.worker_id} leased {len(lease['contacts'])} contacts "
+                     f"of campaign {campaign['id']}")
+        try:
+            self.sender.validate_file(campaign["attached_file"])
+        except (OSError, ValueError) as e:
+            # A problem with this host, not the contacts: another worker may have the file
+            logging.error(f"Worker {self.worker_id}: cannot send campaign {campaign['id']} "
+                          f"({e}), leaving it to other workers")
+            self.queue.release(lease_id)
+            self.skipped_campaigns.add(campaign["id"])
+            return
+
+        contacts = lease["contacts"]
+        index = 0
+        # Contacts whose lost attempt may have sent the message: check the chat before resending
+        check_chat = set()
+        try:
+            while index < len(contacts) and not self.stop_requested:
+                self.sender.maybe_recycle()
+                # Pauses here while the session is recovered; raises if it cannot be
+                if not self.sender.ensure_session():
+                    break
+                if not self.queue.heartbeat(lease_id, self.worker_id, self.lease_seconds):
+                    logging.warning(f"Worker {self.worker_id}: lease {lease_id} expired, dropping batch")
+                    return
+                contact_id, number = contacts[index]
+                result = self.sender.send(number, campaign["message"], campaign["attached_file"],
+                                          check_chat=number in check_chat)
+                if self.sender.session_failed(result):
+                    if self.sender.may_have_sent(result):
+                        check_chat.add(number)
+                    continue
+                if not self.queue.complete(lease_id, contact_id, result["status"], result["reason"]):
+                    logging.warning(f"Result for {number} rejected: contact was reassigned")
+                index += 1
+        finally:
+            self.queue.release(lease_id)
+            self.sender.save_timeouts()
+
+
+def run_worker(args):
+    queue = open_queue(args.queue, args.token)
+    worker_id = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    # Workers only record what they sent; lists are filtered when enqueued
+    suppression = SuppressionIndex(args.suppression_db) if args.suppression_db else None
+    sender = CampaignSender(
+        [], "", None, args.browser, 0, args.driver_dir,
+        events=SenderEvents(), headless=args.headless, profile_dir=args.profile_dir,
+        suppression=suppression, timeouts=AdaptiveTimeouts(args.timeouts_file)
+    )
+    worker = QueueWorker(queue, worker_id, sender, batch_size=args.batch_size,
+                         lease_seconds=args.lease_seconds, exit_when_idle=args.exit_when_idle)
+    sender.should_continue = lambda: not worker.stop_requested
+
+    def request_stop(signum, frame):
+        worker.stop_requested = True
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    return worker.run()
+
+
+def supervise(args):
+    """Runs N worker processes and restarts the ones that crash."""
+    procs = {}
+    stopping = []
+
+    def spawn(index):
+        profile_dir = os.path.join(os.path.abspath(args.profile_root), f"worker_{index}")
+        command = [
+            sys.executable, os.path.abspath(__file__), "worker",
+            "--queue", args.queue, "--token", args.token,
+            "--browser", args.browser, "--driver-dir", args.driver_dir,
+            "--profile-dir", profile_dir, "--batch-size", str(args.batch_size),
+            "--lease-seconds", str(args.lease_seconds), "--timeouts-file", args.timeouts_file,
+            "--worker-id", f"{socket.gethostname()}:worker_{index}"
+        ]
+        if args.suppression_db:
+            command += ["--suppression-db", args.suppression_db]
+        if args.headless:
+            command.append("--headless")
+        procs[index] = subprocess.Popen(command)
+
+    def request_stop(signum, frame):
+        stopping.append(signum)
+        for proc in procs.values():
+            proc.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    for index in range(args.workers):
+        spawn(index)
+    restarts = {index: 0 for index in procs}
+    restart_at = {}
+    while procs or restart_at:
+        time.sleep(1)
+        for index, proc in list(procs.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            del procs[index]
+            if stopping or code in (0, EXIT_LOGIN_REQUIRED):
+                logging.info(f"Worker {index} exited with code {code}")
+                continue
+            restarts[index] += 1
+            backoff = min(60, 2 ** restarts[index])
+            logging.warning(f"Worker {index} crashed with code {code}, restarting in {backoff}s")
+            restart_at[index] = time.time() + backoff
+        for index, when in list(restart_at.items()):
+            if stopping:
+                del restart_at[index]
+            elif time.time() >= when:
+                del restart_at[index]
+                spawn(index)
+    return 0
+
+
+# ------------------- Command Line -------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Campaign queue coordinator and workers.")
+    add_logging_args(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_queue_args(command):
+        command.add_argument("--queue", default="queue.db", help="SQLite file or tcp://host:port")
+        command.add_argument("--token", default=os.getenv("WASENDER_QUEUE_TOKEN", ""))
+
+    def add_worker_args(command):
+        add_queue_args(command)
+        command.add_argument("--browser", default="Chrome")
+        command.add_argument("--driver-dir", default=os.path.join(os.getcwd(), "drivers"))
+        command.add_argument("--headless", action="store_true")
+        command.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        command.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+        command.add_argument("--suppression-db", help="record sent numbers in this suppression index")
+        command.add_argument("--timeouts-file", default="timeouts.json")
+
+    add = commands.add_parser("add", help="enqueue a campaign file")
+    add.add_argument("campaign")
+    add.add_argument("--suppression-db", help="drop previously contacted and opted-out numbers")
+    add_queue_args(add)
+
+    status = commands.add_parser("status", help="show campaign counts")
+    status.add_argument("campaign_id", type=int, nargs="?")
+    add_queue_args(status)
+
+    results = commands.add_parser("results", help="print campaign results as JSON lines")
+    results.add_argument("campaign_id", type=int)
+    add_queue_args(results)
+
+    serve = commands.add_parser("serve", help="expose the queue to remote workers")
+    add_queue_args(serve)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    worker = commands.add_parser("worker", help="run one worker in this process")
+    add_worker_args(worker)
+    worker.add_argument("--profile-dir")
+    worker.add_argument("--worker-id")
+    worker.add_argument("--exit-when-idle", action="store_true")
+
+    supervisor = commands.add_parser("supervise", help="run and restart several workers")
+    add_worker_args(supervisor)
+    supervisor.add_argument("--workers", type=int, default=1)
+    supervisor.add_argument("--profile-root", default="worker_profiles")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    if args.command == "worker":
+        return run_worker(args)
+    if args.command == "supervise":
+        return supervise(args)
+
+    queue = open_queue(args.queue, args.token)
+    if args.command == "add":
+        try:
+            campaign = load_campaign(args.campaign)
+        except CampaignError as e:
+            logging.error(str(e))
+            return EXIT_USAGE
+        numbers = campaign["numbers"]
+        skipped = 0
+        suppression_db = args.suppression_db or campaign["suppression_db"]
+        if suppression_db:
+            suppression = SuppressionIndex(suppression_db, default_region=campaign["default_region"])
+            numbers = suppression.filter(numbers).kept
+            skipped = len(campaign["numbers"]) - len(numbers)
+            suppression.close()
+        campaign_id = queue.add_campaign(
+            numbers, campaign["message"], campaign["attached_file"],
+            name=os.path.basename(args.campaign)
+        )
+        print(json.dumps({"campaign_id": campaign_id, "contacts": len(numbers), "suppressed": skipped}))
+    elif args.command == "status":
+        campaigns = [{"id": args.campaign_id}] if args.campaign_id else queue.list_campaigns()
+        for campaign in campaigns:
+            print(json.dumps({"campaign_id": campaign["id"], **queue.campaign_status(campaign["id"])}))
+    elif args.command == "results":
+        for result in queue.campaign_results(args.campaign_id):
+            print(json.dumps(result, ensure_ascii=False))
+    elif args.command == "serve":
+        if args.host not in ("127.0.0.1", "localhost") and not args.token:
+            logging.error("A --token is required when listening on a public interface")
+            return EXIT_USAGE
+        server = QueueServer(queue, args.host, args.port, args.token)
+        logging.info(f"Campaign queue listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""Headless entry point: runs a campaign file without the PyQt GUI.
+
+Usage:
+    python cli.py campaign.json [--driver-dir DIR] [--install-drivers]
+    python cli.py --serve --api-token TOKEN [campaign.json]
+    python cli.py campaign.json --dry-run
+
+Progress is written to stdout as JSON lines, logs go to stderr. With
+--serve the sender keeps running and takes more work from the localhost
+HTTP API (see http_api.py) until it receives SIGINT/SIGTERM.
+"""
+import sys
+import os
+import json
+import time
+import signal
+import logging
+import argparse
+from log_setup import setup_logging
+from http_api import start_api, DEFAULT_PORT as API_DEFAULT_PORT
+from suppression import SuppressionIndex
+from timeouts import AdaptiveTimeouts
+from session_recycler import RecyclePolicy
+from broadcast import FanoutTarget, STATUS_UNCONFIRMED, validate_targets
+from planner import plan_campaign, estimate_contact_seconds, RateEstimator
+from send_queue import (
+    Campaign, SendScheduler, SendWindow, RetryPolicy, PRIORITY_NORMAL, STATUS_EXPIRED,
+    parse_priority, parse_time
+)
+from sender_core import (
+    DependencyInstaller, CampaignSender, SenderEvents, SUPPORTED_BROWSERS,
+    OUTCOME_COMPLETED, OUTCOME_STOPPED, OUTCOME_LOGIN_REQUIRED, STATUS_NOT_ON_WHATSAPP
+)
+
+# ------------------- Exit Codes -------------------
+EXIT_OK = 0
+EXIT_PARTIAL = 1        # campaign finished but some numbers failed
+EXIT_USAGE = 2          # bad arguments or campaign file
+EXIT_LOGIN_REQUIRED = 3
+EXIT_ERROR = 4          # driver/browser failure before or during the run
+EXIT_STOPPED = 5        # interrupted by SIGINT/SIGTERM
+
+
+class CampaignError(ValueError):
+    pass
+
+
+# ------------------- Campaign File -------------------
+def _read_text(base_dir, path):
+    if not isinstance(path, str):
+        raise CampaignError(f"Expected a file path, got {path!r}")
+    with open(os.path.join(base_dir, path), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _section(data, key):
+    section = data.get(key)
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        raise CampaignError(f"'{key}' must be an object")
+    return section
+
+
+def _list(data, key):
+    items = data.get(key)
+    if items is None:
+        return []
+    if not isinstance(items, list):
+        raise CampaignError(f"'{key}' must be a list")
+    return items
+
+
+def _path(base_dir, data, key):
+    path = data.get(key)
+    if not path:
+        return None
+    if not isinstance(path, str):
+        raise CampaignError(f"'{key}' must be a path")
+    return os.path.join(base_dir, path)
+
+
+def _number(value, name, kind=float):
+    # bool is an int subclass; "true" as a delay is a mistake, not 1
+    if isinstance(value, bool):
+        raise CampaignError(f"'{name}' must be a number, got {value!r}")
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise CampaignError(f"'{name}' must be a number, got {value!r}")
+
+
+def load_campaign(path):
+    """Reads and validates a JSON campaign file.
+
+    Relative paths inside the file are resolved against the file's directory.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CampaignError(f"Cannot read campaign file: {e}")
+    if not isinstance(data, dict):
+        raise CampaignError("Campaign file must contain a JSON object")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    try:
+        numbers = _list(data, "numbers")
+        if "numbers_file" in data:
+            numbers = numbers + _read_text(base_dir, data["numbers_file"]).split("\n")
+        message = data.get("message")
+        if message is None and "message_file" in data:
+            message = _read_text(base_dir, data["message_file"])
+    except OSError as e:
+        raise CampaignError(f"Cannot read campaign input: {e}")
+
+    # e.g. "fanout": [{"type": "broadcast", "name": "Customers 1", "members_file": "list1.txt"}]
+    targets = []
+    try:
+        for spec in _list(data, "fanout"):
+            if isinstance(spec, dict) and "members_file" in spec:
+                spec = dict(spec, members=_read_text(base_dir, spec["members_file"]).split("\n"))
+            targets.append(FanoutTarget.from_dict(spec))
+        validate_targets(targets)
+    except OSError as e:
+        raise CampaignError(f"Cannot read campaign input: {e}")
+    except ValueError as e:
+        raise CampaignError(str(e))
+
+    numbers = [str(n).strip() for n in numbers if str(n).strip()]
+    # Members count as campaign numbers for suppression, results and totals
+    listed = set(numbers)
+    numbers += [m for target in targets for m in target.members if m not in listed]
+    if not numbers:
+        raise CampaignError("Campaign has no numbers")
+    if message is not None and not isinstance(message, str):
+        raise CampaignError("'message' must be a string")
+    if not message or not message.strip():
+        raise CampaignError("Campaign has no message")
+
+    attachments = _list(data, "attachments") or ([data["attachment"]] if data.get("attachment") else [])
+    if not all(isinstance(attachment, str) for attachment in attachments):
+        raise CampaignError("Attachments must be file paths")
+    if len(attachments) > 1:
+        raise CampaignError("Only one attachment per campaign is supported")
+    attached_file = os.path.join(base_dir, attachments[0]) if attachments else None
+
+    browser = data.get("browser", "Chrome")
+    if browser not in SUPPORTED_BROWSERS:
+        raise CampaignError(f"Unsupported browser: {browser}")
+
+    pacing = _section(data, "pacing")
+    pacing = (_number(pacing.get("min", 2), "pacing.min"), _number(pacing.get("max", 5), "pacing.max"))
+    if pacing[0] < 0 or pacing[1] < pacing[0]:
+        raise CampaignError("Pacing must satisfy 0 <= min <= max")
+
+    try:
+        priority = parse_priority(data.get("priority", PRIORITY_NORMAL))
+        start_at = parse_time(data.get("start_at"))
+        deadline = parse_time(data.get("deadline"))
+        windows = [SendWindow.from_dict(spec) for spec in _list(data, "windows")]
+    except ValueError as e:
+        raise CampaignError(str(e))
+    if start_at and deadline and deadline <= start_at:
+        raise CampaignError("Deadline must be after start_at")
+
+    retry = _section(data, "retry")
+    retry_policy = RetryPolicy(max_attempts=_number(retry.get("max_attempts", 3), "retry.max_attempts", int),
+                               base_delay=_number(retry.get("delay", 120), "retry.delay"))
+    if retry_policy.max_attempts < 1 or retry_policy.base_delay < 0:
+        raise CampaignError("Retry needs max_attempts >= 1 and delay >= 0")
+
+    # e.g. "recycle": {"max_contacts": 300, "max_heap_mb": 512, "max_rss_mb": null}
+    try:
+        recycle_policy = RecyclePolicy.from_dict(_section(data, "recycle"))
+    except ValueError as e:
+        raise CampaignError(str(e))
+
+    return {
+        "numbers": numbers,
+        "targets": targets,
+        "message": message,
+        "attached_file": attached_file,
+        "browser": browser,
+        "delay": _number(data.get("delay", 2000), "delay", int),
+        "pacing": pacing,
+        "headless": bool(data.get("headless", False)),
+        "profile_dir": _path(base_dir, data, "profile_dir"),
+        "screenshot_dir": _path(base_dir, data, "screenshot_dir"),
+        "suppression_db": _path(base_dir, data, "suppression_db"),
+        "default_region": data.get("default_region"),
+        "priority": priority,
+        "start_at": start_at,
+        "deadline": deadline,
+        "windows": windows,
+        "retry_policy": retry_policy,
+        "recycle_policy": recycle_policy,
+    }
+
+
+# ------------------- JSON Lines Output -------------------
+class JsonLinesEvents(SenderEvents):
+    def __init__(self, stream=None, estimator=None):
+        self.stream = stream or sys.stdout
+        self.estimator = estimator or RateEstimator()
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        fields["ts"] = round(time.time(), 3)
+        self.stream.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def sent(self, info):
+        self.estimator.update(info["sent"])
+        eta = self.estimator.eta_seconds(info["total"] - info["sent"])
+        rate = self.estimator.per_minute
+        self.emit("sent", **info, rate_per_min=rate and round(rate, 2), eta_s=eta and round(eta))
+
+    def error(self, message):
+        self.emit("error", message=message)
+
+    def login_required(self):
+        self.emit("login_required")
+
+    def paused(self, reason):
+        self.emit("paused", reason=reason)
+
+    def resumed(self):
+        self.emit("resumed")
+
+    def finished(self):
+        self.emit("finished")
+
+
+def add_logging_args(parser):
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--log-format", choices=("text", "json"), default="text",
+                        help="format of the log lines written to stderr")
+    parser.add_argument("--log-dir", help="also write rotated JSON-lines log files here")
+
+
+def configure_logging(args):
+    setup_logging(level=args.log_level.upper(), log_dir=args.log_dir, console_format=args.log_format)
+
+
+def exit_code_for(sender):
+    if sender.outcome == OUTCOME_LOGIN_REQUIRED:
+        return EXIT_LOGIN_REQUIRED
+    if sender.outcome == OUTCOME_STOPPED:
+        return EXIT_STOPPED
+    if sender.outcome != OUTCOME_COMPLETED:
+        return EXIT_ERROR
+    if sender.results.count("Failed") or sender.results.count(STATUS_EXPIRED):
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def dry_run(campaign, timeouts):
+    suppression = None
+    if campaign["suppression_db"]:
+        suppression = SuppressionIndex(campaign["suppression_db"], default_region=campaign["default_region"])
+    try:
+        plan = plan_campaign(
+            campaign["numbers"], suppression, timeouts, campaign["pacing"],
+            attachment=bool(campaign["attached_file"]), start_at=campaign["start_at"],
+            deadline=campaign["deadline"], windows=campaign["windows"], targets=campaign["targets"]
+        )
+    except ValueError as e:
+        # Same rejection as a real run
+        logging.error(str(e))
+        return EXIT_USAGE
+    finally:
+        if suppression is not None:
+            suppression.close()
+    JsonLinesEvents().emit("plan", **plan)
+    return EXIT_OK
+
+
+def serve_settings(args):
+    """Sender settings for --serve without a campaign file."""
+    return {
+        "browser": args.browser,
+        "delay": 2000,
+        "pacing": (2.0, 5.0),
+        "headless": args.headless,
+        "profile_dir": args.profile_dir,
+        "screenshot_dir": None,
+        "suppression_db": args.suppression_db,
+        "default_region": None,
+        "retry_policy": RetryPolicy(),
+        "recycle_policy": RecyclePolicy(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send a WhatsApp campaign without the GUI.")
+    parser.add_argument("campaign", nargs="?", help="path to the JSON campaign file")
+    parser.add_argument("--driver-dir", default=os.path.join(os.getcwd(), "drivers"),
+                        help="directory containing the WebDriver binaries")
+    parser.add_argument("--install-drivers", action="store_true",
+                        help="download missing WebDriver binaries before sending")
+    parser.add_argument("--timeouts-file", default="timeouts.json",
+                        help="where learned step timeouts are kept between runs")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print what would be sent and the estimated finish time, without a browser")
+    api = parser.add_argument_group("HTTP API (daemon mode)")
+    api.add_argument("--serve", action="store_true",
+                     help="keep running and accept messages over the HTTP API")
+    api.add_argument("--api-host", default="127.0.0.1")
+    api.add_argument("--api-port", type=int, default=API_DEFAULT_PORT)
+    api.add_argument("--api-token", default=os.environ.get("WASENDER_API_TOKEN"),
+                     help="bearer token clients must send (default: $WASENDER_API_TOKEN)")
+    api.add_argument("--browser", choices=SUPPORTED_BROWSERS, default="Chrome",
+                     help="browser to use when no campaign file is given")
+    api.add_argument("--headless", action="store_true")
+    api.add_argument("--profile-dir")
+    api.add_argument("--suppression-db")
+    add_logging_args(parser)
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    if not args.campaign and not args.serve:
+        parser.error("a campaign file is required unless --serve is given")
+    if args.serve and not args.api_token:
+        parser.error("--serve needs --api-token or WASENDER_API_TOKEN")
+
+    campaign = None
+    settings = serve_settings(args)
+    if args.campaign:
+        try:
+            campaign = settings = load_campaign(args.campaign)
+        except CampaignError as e:
+            logging.error(str(e))
+            return EXIT_USAGE
+        if args.dry_run:
+            return dry_run(campaign, AdaptiveTimeouts(args.timeouts_file))
+
+    browser_paths = {}
+    if args.install_drivers or settings["browser"] == "Brave":
+        installer = DependencyInstaller()
+        browser_paths = installer.browser_paths
+        if args.install_drivers:
+            installer.install_chromedriver()
+            installer.install_geckodriver()
+            installer.install_edgedriver()
+            args.driver_dir = installer.driver_dir
+
+    stop_requested = []
+
+    def request_stop(signum, frame):
+        logging.warning(f"Received signal {signum}, stopping after the current contact")
+        stop_requested.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    suppression = None
+    if settings["suppression_db"]:
+        suppression = SuppressionIndex(settings["suppression_db"], default_region=settings["default_region"])
+
+    timeouts = AdaptiveTimeouts(args.timeouts_file)
+    events = JsonLinesEvents(estimator=RateEstimator(
+        initial_seconds=estimate_contact_seconds(timeouts, settings["pacing"], bool(campaign and campaign["attached_file"]))
+    ))
+    name = os.path.splitext(os.path.basename(args.campaign))[0] if args.campaign else "api"
+    sender = CampaignSender(
+        [], "", None, settings["browser"], settings["delay"], args.driver_dir,
+        browser_paths=browser_paths, events=events,
+        should_continue=lambda: not stop_requested,
+        pacing=settings["pacing"], headless=settings["headless"],
+        profile_dir=settings["profile_dir"], screenshot_dir=settings["screenshot_dir"],
+        campaign_id=name, suppression=suppression, timeouts=timeouts,
+        scheduler=SendScheduler(close_when_idle=not args.serve, retry_policy=settings["retry_policy"],
+                                keep_done=not args.serve),
+        recycle_policy=settings["recycle_policy"]
+    )
+    if campaign is not None:
+        try:
+            sender.enqueue(Campaign(
+                campaign["numbers"], campaign["message"], campaign["attached_file"], name=name,
+                priority=campaign["priority"], start_at=campaign["start_at"],
+                deadline=campaign["deadline"], windows=campaign["windows"], targets=campaign["targets"]
+            ))
+        except (OSError, ValueError) as e:
+            logging.error(str(e))
+            if suppression is not None:
+                suppression.close()
+            return EXIT_USAGE
+
+    server = None
+    if args.serve:
+        try:
+            server = start_api(sender, args.api_token, args.api_host, args.api_port)
+        except OSError as e:
+            logging.error(f"Cannot start the HTTP API: {e}")
+            return EXIT_USAGE
+    try:
+        sender.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+        if suppression is not None:
+            suppression.close()
+
+    counts = sender.results.counts()
+    events.emit("summary", outcome=sender.outcome,
+                total=len(campaign["numbers"]) if campaign else len(sender.results),
+                processed=len(sender.results), sent=counts.get("Success", 0),
+                failed=counts.get("Failed", 0), suppressed=counts.get("Suppressed", 0),
+                not_on_whatsapp=counts.get(STATUS_NOT_ON_WHATSAPP, 0),
+                expired=counts.get(STATUS_EXPIRED, 0), unconfirmed=counts.get(STATUS_UNCONFIRMED, 0))
+    return exit_code_for(sender)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""Localhost HTTP API for feeding a running sender from other systems.
+
+    POST /v1/messages        JSON object, JSON list or NDJSON of
+                             {"number", "message", "attachment"?, "priority"?,
+                              "start_at"?, "deadline"?, "campaign"?,
+                              "skip_contacted"?}
+    POST /v1/campaigns       one campaign file style object (numbers, message,
+                             fanout, ...)
+    GET  /v1/messages/<id>   status of one message
+    GET  /v1/campaigns/<id>  counts for one campaign
+    GET  /v1/health
+
+Every request needs "Authorization: Bearer <token>". Submissions are
+validated and grouped into scheduler campaigns in the request thread; the
+sending thread only ever waits on the scheduler lock for an append, so a
+burst of submissions does not slow sending down.
+
+API messages are usually transactional, so with a suppression database
+only opt-outs and unregistered numbers are skipped; set "skip_contacted"
+to also skip numbers that were messaged before. Uploaded attachments are
+stored by content hash and deleted once no campaign uses them.
+"""
+import os
+import json
+import hmac
+import hashlib
+import base64
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from send_queue import Campaign, PRIORITY_NORMAL, CAMPAIGN_DONE, parse_priority, parse_time, SendWindow
+from broadcast import FanoutTarget, validate_targets
+
+DEFAULT_PORT = 8080
+MAX_BODY_BYTES = 32 * 1024 * 1024
+UPLOAD_DIR = "api_uploads"
+
+MESSAGE_QUEUED = "queued"
+
+logger = logging.getLogger("wasender.api")
+
+
+class SubmissionError(ValueError):
+    pass
+
+
+# ------------------- Enqueue Service -------------------
+class EnqueueService:
+    """Turns API submissions into scheduler campaigns and tracks their messages.
+
+    Message and campaign records are kept for the last `max_tracked`
+    submissions; older ones are forgotten (404 on lookup).
+    """
+
+    def __init__(self, sender, upload_dir=UPLOAD_DIR, max_tracked=1_000_000):
+        self.sender = sender
+        self.upload_dir = upload_dir
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._messages = OrderedDict()
+        self._campaigns = OrderedDict()
+        # (campaign id, number) -> message ids waiting for a result, oldest first
+        self._waiting = {}
+        # Uploaded file -> unfinished campaigns sending it and requests still using it
+        self._uploads = {}
+
+    def submit_messages(self, items):
+        """Queues individual messages; returns {"accepted": [...], "rejected": [...]}.
+
+        Items sharing message, attachment and schedule become one campaign,
+        so a batch of identical notifications is sent as a single lane.
+        """
+        accepted, rejected = [], []
+        groups = OrderedDict()
+        uploads = set()
+        try:
+            for index, item in enumerate(items):
+                try:
+                    number, key = self._parse_message(item, uploads)
+                except (SubmissionError, OSError, ValueError, TypeError, AttributeError) as e:
+                    rejected.append({"index": index, "error": str(e)})
+                    continue
+                groups.setdefault(key, []).append((index, number))
+
+            for key, entries in groups.items():
+                message, attached_file, priority, start_at, deadline, name, skip_contacted = key
+                campaign = Campaign([number for _, number in entries], message, attached_file, name=name,
+                                    priority=priority, start_at=start_at, deadline=deadline,
+                                    skip_contacted=skip_contacted)
+                ids = self._enqueue(campaign)
+                if ids is None:
+                    rejected.extend({"index": index, "error": "Sender is shutting down"} for index, _ in entries)
+                    continue
+                accepted.extend({"index": index, "id": message_id, "campaign_id": campaign.id}
+                                for (index, _), message_id in zip(entries, ids))
+        finally:
+            self._discard_unused(uploads)
+        accepted.sort(key=lambda entry: entry["index"])
+        return {"accepted": accepted, "rejected": rejected}
+
+    def submit_campaign(self, spec):
+        if not isinstance(spec, dict):
+            raise SubmissionError("Campaign must be a JSON object")
+        numbers = spec.get("numbers") or []
+        fanout = spec.get("fanout") or []
+        windows = spec.get("windows") or []
+        if not all(isinstance(value, list) for value in (numbers, fanout, windows)):
+            raise SubmissionError("numbers, fanout and windows must be JSON lists")
+        numbers = [str(n).strip() for n in numbers if str(n).strip()]
+        targets = [FanoutTarget.from_dict(target) for target in fanout]
+        message = spec.get("message")
+        name = spec.get("name")
+        if name is not None and not isinstance(name, str):
+            raise SubmissionError("Campaign name must be a string")
+        if not numbers and not targets:
+            raise SubmissionError("Campaign has no numbers")
+        if not isinstance(message, str) or not message.strip():
+            raise SubmissionError("Campaign has no message")
+        validate_targets(targets)
+        self.sender.validate_numbers(numbers + [member for target in targets for member in target.members])
+        priority = parse_priority(spec.get("priority", PRIORITY_NORMAL))
+        start_at, deadline = parse_time(spec.get("start_at")), parse_time(spec.get("deadline"))
+        windows = [SendWindow.from_dict(window) for window in windows]
+        uploads = set()
+        try:
+            attached_file = self._attachment(spec.get("attachment"), uploads)
+            campaign = Campaign(
+                numbers, message, attached_file, name=name, targets=targets,
+                priority=priority, start_at=start_at, deadline=deadline, windows=windows,
+                skip_contacted=bool(spec.get("skip_contacted", False))
+            )
+            ids = self._enqueue(campaign)
+        finally:
+            self._discard_unused(uploads)
+        if ids is None:
+            raise SubmissionError("Sender is shutting down")
+        return {"campaign_id": campaign.id, "ids": ids}
+
+    def message_status(self, message_id):
+        with self._lock:
+            record = self._messages.get(message_id)
+            return None if record is None else dict(record, id=message_id)
+
+    def campaign_status(self, campaign_id):
+        with self._lock:
+            campaign = self._campaigns.get(campaign_id)
+        return None if campaign is None else campaign.status()
+
+    def _parse_message(self, item, uploads):
+        if not isinstance(item, dict):
+            raise SubmissionError("Each message must be a JSON object")
+        number = str(item.get("number", "")).strip()
+        message = item.get("message")
+        if not number:
+            raise SubmissionError("Missing number")
+        if not isinstance(message, str) or not message.strip():
+            raise SubmissionError("Missing message")
+        # Part of the grouping key, so it must be hashable
+        name = item.get("campaign") or "api"
+        if not isinstance(name, str):
+            raise SubmissionError("Campaign name must be a string")
+        self.sender.validate_numbers([number])
+        priority = parse_priority(item.get("priority", PRIORITY_NORMAL))
+        start_at, deadline = parse_time(item.get("start_at")), parse_time(item.get("deadline"))
+        key = (
+            message,
+            self._attachment(item.get("attachment"), uploads),
+            priority,
+            start_at,
+            deadline,
+            name,
+            bool(item.get("skip_contacted", False)),
+        )
+        return number, key
+
+    def _attachment(self, attachment, uploads):
+        """A path on this machine, or {"name", "content_base64"} saved under upload_dir.
+
+        Uploads are named by content hash, so identical attachments in a
+        batch share one file (and one campaign). The request holds each file
+        it uploads until _discard_unused(uploads).
+        """
+        if attachment is None:
+            return None
+        if isinstance(attachment, str):
+            self.sender.validate_file(attachment)
+            return attachment
+        if not isinstance(attachment, dict):
+            raise SubmissionError("Attachment must be a path or {\"name\", \"content_base64\"}")
+        try:
+            name = os.path.basename(attachment["name"])
+            content = base64.b64decode(attachment["content_base64"], validate=True)
+        except (KeyError, TypeError, ValueError):
+            raise SubmissionError("Attachment needs a name and base64 content_base64")
+        if not name.lower().endswith(self.sender.supported_files):
+            raise SubmissionError(f"Unsupported file type: {os.path.splitext(name)[1]}")
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        path = os.path.abspath(os.path.join(self.upload_dir, f"{digest}_{name}"))
+        with self._lock:
+            if path not in self._uploads:
+                os.makedirs(self.upload_dir, exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(content)
+                os.replace(path + ".tmp", path)
+                self._uploads[path] = set()
+            self._uploads[path].add(("request", id(uploads)))
+            uploads.add(path)
+        return path
+
+    def _discard_unused(self, uploads):
+        """Drops a request's hold on its uploads, deleting those no queued campaign uses."""
+        for path in uploads:
+            self._release(path, ("request", id(uploads)))
+
+    def _release(self, path, holder):
+        with self._lock:
+            holders = self._uploads.get(path)
+            if holders is None:
+                return
+            holders.discard(holder)
+            if holders:
+                return
+            del self._uploads[path]
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning("Could not delete upload %s: %s", path, e)
+
+    def _enqueue(self, campaign):
+        """Registers message ids, then queues the campaign; None if the
+        scheduler no longer accepts work."""
+        with self._lock:
+            ids = [f"m{next(self._ids)}" for _ in campaign.numbers]
+            for message_id, number in zip(ids, campaign.numbers):
+                self._messages[message_id] = {
+                    "number": number, "campaign_id": campaign.id, "status": MESSAGE_QUEUED, "reason": ""
+                }
+                self._waiting.setdefault((campaign.id, number), deque()).append(message_id)
+            self._campaigns[campaign.id] = campaign
+            self._trim()
+        campaign.on_record = self._recorded
+        queued = False
+        try:
+            queued = self.sender.enqueue(campaign)
+        finally:
+            if not queued:
+                with self._lock:
+                    for message_id, number in zip(ids, campaign.numbers):
+                        self._messages.pop(message_id, None)
+                        self._waiting.pop((campaign.id, number), None)
+                    self._campaigns.pop(campaign.id, None)
+        if not queued:
+            return None
+        with self._lock:
+            if campaign.attached_file in self._uploads:
+                self._uploads[campaign.attached_file].add(campaign.id)
+        # It may have finished already (all suppressed, or sent while we got here)
+        if campaign.state == CAMPAIGN_DONE:
+            self._release(campaign.attached_file, campaign.id)
+        return ids
+
+    def _recorded(self, campaign, result):
+        with self._lock:
+            waiting = self._waiting.get((campaign.id, result["number"]))
+            if not waiting:
+                return
+            record = self._messages.get(waiting.popleft())
+            if not waiting:
+                del self._waiting[(campaign.id, result["number"])]
+            if record is not None:
+                record["status"] = result["status"]
+                record["reason"] = result["reason"]
+        if campaign.state == CAMPAIGN_DONE:
+            self._release(campaign.attached_file, campaign.id)
+
+    def _trim(self):
+        while len(self._messages) > self.max_tracked:
+            self._messages.popitem(last=False)
+        while len(self._campaigns) > self.max_tracked:
+            self._campaigns.popitem(last=False)
+
+
+# ------------------- HTTP Server -------------------
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "WASender/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["v1", "health"]:
+            self._send_json(200, {"ok": True})
+        elif len(parts) == 3 and parts[:2] == ["v1", "messages"]:
+            self._lookup(self.server.service.message_status(parts[2]))
+        elif len(parts) == 3 and parts[:2] == ["v1", "campaigns"] and parts[2].isdigit():
+            self._lookup(self.server.service.campaign_status(int(parts[2])))
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            body = self._read_body()
+            if self.path == "/v1/messages":
+                result = self.server.service.submit_messages(body if isinstance(body, list) else [body])
+                self._send_json(202 if result["accepted"] else 400, result)
+            elif self.path == "/v1/campaigns":
+                self._send_json(202, self.server.service.submit_campaign(body))
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except (SubmissionError, OSError, ValueError, TypeError, AttributeError) as e:
+            # Malformed JSON shapes surface as TypeError/AttributeError
+            self._send_json(400, {"error": str(e)})
+
+    def _authorized(self):
+        expected = f"Bearer {self.server.token}"
+        if hmac.compare_digest(self.headers.get("Authorization", ""), expected):
+            return True
+        self._send_json(401, {"error": "Invalid or missing token"})
+        return False
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise SubmissionError(f"Request body over {MAX_BODY_BYTES} bytes")
+        raw = self.rfile.read(length).decode("utf-8")
+        if "ndjson" in self.headers.get("Content-Type", ""):
+            return [json.loads(line) for line in raw.splitlines() if line.strip()]
+        return json.loads(raw)
+
+    def _lookup(self, record):
+        if record is None:
+            self._send_json(404, {"error": "Unknown id"})
+        else:
+            self._send_json(200, record)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, service, host, port, token):
+        if not token:
+            raise ValueError("The HTTP API needs a token")
+        super().__init__((host, port), ApiRequestHandler)
+        self.service = service
+        self.token = token
+
+
+def start_api(sender, token, host="127.0.0.1", port=DEFAULT_PORT, upload_dir=UPLOAD_DIR):
+    """Serves the API on a daemon thread; returns the server (call shutdown() to stop)."""
+    server = ApiServer(EnqueueService(sender, upload_dir), host, port, token)
+    threading.Thread(target=server.serve_forever, name="http-api", daemon=True).start()
+    logger.info("HTTP API listening on http://%s:%s", host, server.server_address[1])
+    return server
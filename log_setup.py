@@ -0,0 +1,164 @@
+"""Logging setup shared by the GUI, the CLI and the queue workers.
+
+Records are handed to a QueueHandler on the calling thread and written by a
+QueueListener thread, so the send loop never waits on disk or console I/O.
+Files are JSON lines, rotated by size (or time) and gzip-compressed. A ring
+buffer keeps the most recent records in memory for the GUI log view.
+"""
+import os
+import sys
+import copy
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from collections import deque
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Extra fields the sender attaches to its records
+CONTEXT_FIELDS = ("campaign", "number", "step", "status", "duration")
+
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records; the GUI drains the new ones on a timer."""
+
+    def __init__(self, capacity=5000, level=logging.INFO):
+        super().__init__(level)
+        self._unread = deque(maxlen=capacity)
+
+    def emit(self, record):
+        entry = (
+            record.created, record.levelno, getattr(record, "number", None),
+            getattr(record, "step", None), record.getMessage()
+        )
+        self._unread.append(entry)
+
+    def drain(self):
+        """Returns the records added since the last call, oldest first."""
+        entries = []
+        while True:
+            try:
+                entries.append(self._unread.popleft())
+            except IndexError:
+                return entries
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message.
+
+    The stock prepare() appends it to msg, which would leave the JSON "exc"
+    field empty and put multi-line tracebacks into "msg".
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class ContextAdapter(logging.LoggerAdapter):
+    """LoggerAdapter that merges its context with per-call `extra` fields."""
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _file_handler(path, max_bytes, backup_count, when):
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonLinesFormatter())
+    return handler
+
+
+def setup_logging(level=logging.INFO, log_dir=None, file_name="wasender.jsonl",
+                  max_bytes=10 * 1024 * 1024, backup_count=10, when=None,
+                  console=True, console_format="text", ring_buffer_size=0):
+    """Routes the root logger through a background QueueListener.
+
+    Returns the RingBufferHandler when ring_buffer_size > 0, otherwise None.
+    Calling it again replaces the previous configuration.
+    """
+    global _listener
+    shutdown_logging()
+
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(
+            JsonLinesFormatter() if console_format == "json" else logging.Formatter(TEXT_FORMAT)
+        )
+        handlers.append(console_handler)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        handlers.append(_file_handler(os.path.join(log_dir, file_name), max_bytes, backup_count, when))
+    ring_buffer = None
+    if ring_buffer_size:
+        ring_buffer = RingBufferHandler(ring_buffer_size)
+        handlers.append(ring_buffer)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return ring_buffer
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
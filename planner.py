@@ -0,0 +1,158 @@
+"""Dry-run planning and live ETA for campaigns.
+
+prepare_send() is what enqueueing a campaign does to its list: validation,
+suppression (which also drops duplicates) and fan-out planning.
+plan_campaign() runs the same function without opening a browser and estimates how
+long sending takes from the latencies recorded in timeouts.json. While a
+campaign runs, RateEstimator turns the processed count into a smoothed
+contacts/minute rate and an ETA.
+
+With fan-out targets (see broadcast.py) the duration is estimated per chat
+sent to, since a broadcast list or group costs about as much as a contact.
+"""
+import time
+import datetime
+from suppression import REASON_SENT, FilterResult, validate_numbers
+from broadcast import plan_fanout, validate_targets
+
+# Per-contact latency without history: chat open, load, compose, send, verify
+DEFAULT_CONTACT_SECONDS = 8.0
+# Extra time per contact for the attach steps when there is no history for them
+DEFAULT_ATTACH_SECONDS = 4.0
+
+
+def estimate_contact_seconds(timeouts=None, pacing=(2, 5), attachment=False):
+    """Expected seconds per contact: recorded median (or a default) plus mean pacing."""
+    seconds = timeouts.typical("contact") if timeouts is not None else None
+    if seconds is None:
+        seconds = DEFAULT_CONTACT_SECONDS
+        if attachment:
+            seconds += DEFAULT_ATTACH_SECONDS
+    return seconds + (pacing[0] + pacing[1]) / 2
+
+
+def finish_time(start, seconds, windows=None):
+    """When `seconds` of sending that begins at `start` ends, counting only
+    time inside the send windows (if any). None if a window never opens."""
+    if not windows:
+        return start + seconds
+    moment = start
+    remaining = seconds
+    # One iteration per window occurrence; a year of daily windows is plenty
+    for _ in range(800):
+        opens = [o for o in (w.next_open(moment) for w in windows) if o is not None]
+        if not opens:
+            return None
+        moment = min(opens)
+        closes = max(w.next_close(moment) for w in windows if w.contains(moment))
+        span = min(remaining, closes - moment)
+        remaining -= span
+        moment += span
+        if remaining <= 0:
+            return moment
+    return None
+
+
+def prepare_send(numbers, suppression=None, targets=(), skip_contacted=True):
+    """Returns (FilterResult, FanoutPlan) for what a run sends to.
+
+    Raises ValueError for an invalid number or overlapping targets. Without
+    a suppression index every number is kept as given, duplicates included.
+    """
+    validate_numbers(numbers)
+    validate_targets(targets)
+    if suppression is None:
+        selected = FilterResult(list(numbers), [], [], [])
+    else:
+        selected = suppression.filter(numbers, ignore_reasons=() if skip_contacted else (REASON_SENT,))
+    return selected, plan_fanout(selected.kept, targets)
+
+
+def plan_campaign(numbers, suppression=None, timeouts=None, pacing=(2, 5), attachment=False,
+                  start_at=None, deadline=None, windows=None, targets=(), skip_contacted=True, now=None):
+    """Returns a dict describing what a run would send and when it would finish.
+
+    Raises ValueError where enqueueing the campaign would.
+    """
+    selected, fanout = prepare_send(numbers, suppression, targets, skip_contacted)
+    to_send = len(selected.kept)
+    chats = len(fanout.items)
+
+    now = time.time() if now is None else now
+    start = max(now, start_at or now)
+    per_contact = estimate_contact_seconds(timeouts, pacing, attachment)
+    duration = chats * per_contact
+    finish = finish_time(start, duration, windows)
+    return {
+        "total": len(numbers),
+        "to_send": to_send,
+        "chats": chats,
+        "fanout_targets": len(fanout.targets),
+        "duplicates": len(selected.duplicates),
+        "suppressed": len(selected.suppressed),
+        "seconds_per_contact": round(per_contact, 2),
+        "history": timeouts is not None and timeouts.typical("contact") is not None,
+        "duration_seconds": round(duration),
+        "start": start,
+        "finish": finish,
+        "meets_deadline": None if deadline is None else finish is not None and finish <= deadline,
+    }
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes = rest // 60
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds % 60:02d}s" if minutes else f"{seconds}s"
+
+
+def format_clock(moment):
+    """HH:MM for today, otherwise with the date."""
+    local = datetime.datetime.fromtimestamp(moment)
+    if local.date() == datetime.date.today():
+        return local.strftime("%H:%M")
+    return local.strftime("%Y-%m-%d %H:%M")
+
+
+# ------------------- Live Rate -------------------
+class RateEstimator:
+    """Exponentially weighted seconds-per-contact from a growing processed count.
+
+    Each batch of newly processed contacts adds one observation weighted
+    by alpha, so a single slow contact or a pause moves the ETA only
+    gradually.
+    """
+
+    def __init__(self, alpha=0.15, initial_seconds=None):
+        self.alpha = alpha
+        self.seconds_per_contact = initial_seconds
+        self._last_count = None
+        self._last_time = None
+
+    def update(self, processed, now=None):
+        now = time.monotonic() if now is None else now
+        if self._last_count is None or processed < self._last_count:
+            self._last_count, self._last_time = processed, now
+            return
+        done = processed - self._last_count
+        if not done:
+            return
+        observed = (now - self._last_time) / done
+        if self.seconds_per_contact is None:
+            self.seconds_per_contact = observed
+        else:
+            self.seconds_per_contact += self.alpha * (observed - self.seconds_per_contact)
+        self._last_count, self._last_time = processed, now
+
+    @property
+    def per_minute(self):
+        if not self.seconds_per_contact:
+            return None
+        return 60 / self.seconds_per_contact
+
+    def eta_seconds(self, remaining):
+        if self.seconds_per_contact is None:
+            return None
+        return remaining * self.seconds_per_contact
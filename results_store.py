@@ -0,0 +1,120 @@
+"""Column-oriented store for per-contact send results.
+
+A list of result dicts costs a few hundred bytes per contact, mostly in
+repeated keys and in exception text that is nearly identical from one
+failure to the next. The store keeps one typed array per field instead:
+status and reason are small integer codes into lookup tables, timestamps
+are packed doubles, and per-status counts are kept as rows are added, so
+the GUI counters and "failed only" reports never rebuild dicts.
+"""
+import time
+import threading
+from array import array
+
+# Known statuses get stable codes; anything else is added to the table on first use
+STATUSES = ("Success", "Failed", "Suppressed", "Not on WhatsApp", "Expired", "Unconfirmed")
+MAX_REASON_LENGTH = 300
+
+
+def _reason_key(reason):
+    # Selenium messages append a stack trace and session ids after the
+    # first line; keeping only that line lets identical failures share an entry.
+    return reason.split("\n", 1)[0].strip()[:MAX_REASON_LENGTH]
+
+
+class ResultStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.numbers = []
+        self.statuses = array("B")
+        self.reasons = array("I")
+        self.campaigns = array("I")
+        self.timestamps = array("d")
+        self._status_table = list(STATUSES)
+        self._status_codes = {status: code for code, status in enumerate(STATUSES)}
+        self._reason_table = [""]
+        self._reason_codes = {"": 0}
+        self._campaign_table = [None]
+        self._campaign_codes = {None: 0}
+        self._counts = [0] * len(STATUSES)
+
+    @staticmethod
+    def _intern(value, table, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def append(self, result, campaign=None, timestamp=None):
+        """Adds a result dict ({"number", "status", "reason"})."""
+        with self._lock:
+            status = self._intern(result["status"], self._status_table, self._status_codes)
+            if status == len(self._counts):
+                self._counts.append(0)
+            self.numbers.append(result["number"])
+            self.statuses.append(status)
+            self.reasons.append(self._intern(_reason_key(result["reason"]), self._reason_table, self._reason_codes))
+            self.campaigns.append(self._intern(campaign, self._campaign_table, self._campaign_codes))
+            self.timestamps.append(time.time() if timestamp is None else timestamp)
+            self._counts[status] += 1
+
+    def extend(self, results, campaign=None):
+        now = time.time()
+        for result in results:
+            self.append(result, campaign, now)
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._row(index)
+
+    def __iter__(self):
+        return self.rows()
+
+    def _row(self, index):
+        return {
+            "number": self.numbers[index],
+            "status": self._status_table[self.statuses[index]],
+            "reason": self._reason_table[self.reasons[index]],
+            "campaign": self._campaign_table[self.campaigns[index]],
+            "timestamp": self.timestamps[index],
+        }
+
+    def count(self, status):
+        with self._lock:
+            code = self._status_codes.get(status)
+            return 0 if code is None else self._counts[code]
+
+    def counts(self):
+        """Returns {status: count} for the statuses seen so far."""
+        with self._lock:
+            return {self._status_table[code]: n for code, n in enumerate(self._counts) if n}
+
+    def rows(self, status=None):
+        """Yields result dicts, optionally only those with `status`.
+
+        Filtering scans the status column and only builds dicts for matches.
+        Rows added while iterating are not included.
+        """
+        with self._lock:
+            size = len(self.statuses)
+            code = None if status is None else self._status_codes.get(status)
+        if status is None:
+            for index in range(size):
+                yield self._row(index)
+            return
+        if code is None:
+            return
+        # bytes.find skips non-matching rows in C, one byte per row
+        column = self.statuses[:size].tobytes()
+        marker = bytes((code,))
+        index = column.find(marker)
+        while index != -1:
+            yield self._row(index)
+            index = column.find(marker, index + 1)
+
+    def numbers_with_status(self, status):
+        return [row["number"] for row in self.rows(status)]
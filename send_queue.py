@@ -0,0 +1,482 @@
+"""Priority lanes and schedules for campaigns sharing one WhatsApp session.
+
+SendScheduler hands out one contact at a time, so a campaign added with a
+higher priority preempts the others at the next contact boundary: its first
+message waits for at most the contact already in flight, however long the
+backlog is. Campaigns of the same priority take turns contact by contact.
+
+A campaign can start at a given time, send only inside recurring daily
+windows, and expire at a deadline; contacts still pending at the deadline
+are reported as expired instead of being sent late.
+
+Contacts that failed for a transient reason go back to their campaign for
+a later pass, spaced by RetryPolicy, until they run out of attempts.
+
+A queued item is either a number or a FanoutTarget (see broadcast.py)
+that reaches several numbers with one send; totals, expiry and results are
+counted per number either way.
+"""
+import time
+import heapq
+import datetime
+import itertools
+import threading
+from collections import deque
+from broadcast import FanoutTarget
+
+PRIORITY_URGENT = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+PRIORITY_BULK = 3
+PRIORITIES = {
+    "urgent": PRIORITY_URGENT,
+    "high": PRIORITY_HIGH,
+    "normal": PRIORITY_NORMAL,
+    "bulk": PRIORITY_BULK,
+}
+
+STATUS_EXPIRED = "Expired"
+
+CAMPAIGN_SCHEDULED = "scheduled"
+CAMPAIGN_ACTIVE = "active"
+CAMPAIGN_DONE = "done"
+CAMPAIGN_CANCELLED = "cancelled"
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_campaign_ids = itertools.count(1)
+
+
+class RetryPolicy:
+    """Backoff between retry passes: base_delay, then times `factor` per attempt."""
+
+    def __init__(self, max_attempts=3, base_delay=120, factor=4, max_delay=3600):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+
+    def delay(self, attempts):
+        """Seconds before the next attempt after `attempts` failures, or None
+        when the contact has used all of its attempts."""
+        if attempts >= self.max_attempts:
+            return None
+        return min(self.max_delay, self.base_delay * self.factor ** (attempts - 1))
+
+
+def parse_priority(value):
+    if isinstance(value, str):
+        if value.lower() not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {value} (expected one of {', '.join(PRIORITIES)})")
+        return PRIORITIES[value.lower()]
+    if not isinstance(value, int) or not PRIORITY_URGENT <= value <= PRIORITY_BULK:
+        raise ValueError(f"Priority must be {PRIORITY_URGENT}-{PRIORITY_BULK} or a priority name")
+    return value
+
+
+def parse_time(value):
+    """Returns epoch seconds from an epoch number or an ISO 8601 string (local
+    time unless it carries an offset)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid time: {value!r} (expected ISO 8601, e.g. 2024-05-01T09:00)")
+
+
+def _minutes(value):
+    try:
+        hours, minutes = value.split(":")
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid time of day: {value!r} (expected HH:MM)")
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"Invalid time of day: {value!r}")
+    return total
+
+
+def _weekdays(spec):
+    """"mon-fri", "sat,sun" or a list of names; None means every day."""
+    if spec is None:
+        return set(range(7))
+    parts = spec.split(",") if isinstance(spec, str) else spec
+    days = set()
+    for part in parts:
+        first, _, last = part.strip().lower().partition("-")
+        try:
+            start = WEEKDAYS.index(first[:3])
+            end = WEEKDAYS.index(last[:3]) if last else start
+        except ValueError:
+            raise ValueError(f"Invalid weekday in {spec!r}")
+        day = start
+        days.add(day)
+        while day != end:
+            day = (day + 1) % 7
+            days.add(day)
+    return days
+
+
+# ------------------- Send Windows -------------------
+class SendWindow:
+    """Recurring daily window in local time, e.g. SendWindow("09:00", "17:00", "mon-fri").
+
+    A window that ends before it starts runs overnight into the next day.
+    """
+
+    def __init__(self, start, end, days=None):
+        self.start = _minutes(start)
+        self.end = _minutes(end)
+        if self.start == self.end:
+            raise ValueError(f"Send window {start}-{end} is empty (start and end are the same)")
+        self.days = _weekdays(days)
+
+    @classmethod
+    def from_dict(cls, spec):
+        try:
+            return cls(spec["start"], spec["end"], spec.get("days"))
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(f"Invalid send window: {spec!r} (expected start, end and optional days)")
+
+    def contains(self, moment):
+        local = datetime.datetime.fromtimestamp(moment)
+        minute = local.hour * 60 + local.minute
+        day = local.weekday()
+        if self.start <= self.end:
+            return day in self.days and self.start <= minute < self.end
+        return ((day in self.days and minute >= self.start)
+                or ((day - 1) % 7 in self.days and minute < self.end))
+
+    def next_close(self, moment):
+        """End of the occurrence containing `moment` (which must be inside the window)."""
+        local = datetime.datetime.fromtimestamp(moment)
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.start > self.end and local.hour * 60 + local.minute >= self.start:
+            midnight += datetime.timedelta(days=1)
+        return (midnight + datetime.timedelta(minutes=self.end)).timestamp()
+
+    def next_open(self, moment):
+        """Returns the first time at or after `moment` inside the window, or None."""
+        if self.contains(moment):
+            return moment
+        midnight = datetime.datetime.fromtimestamp(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(8):
+            opens = midnight + datetime.timedelta(days=offset, minutes=self.start)
+            if opens.weekday() in self.days and opens.timestamp() > moment:
+                return opens.timestamp()
+        return None
+
+
+# ------------------- Campaign -------------------
+class Campaign:
+    def __init__(self, numbers, message, attached_file=None, name=None, priority=PRIORITY_NORMAL,
+                 start_at=None, deadline=None, windows=None, targets=None, skip_contacted=True):
+        self.id = next(_campaign_ids)
+        self.name = name or f"campaign-{self.id}"
+        self.numbers = list(numbers)
+        # Broadcast lists / groups; their members are part of the campaign's numbers
+        self.targets = list(targets or [])
+        listed = set(self.numbers)
+        for target in self.targets:
+            for member in target.members:
+                if member not in listed:
+                    listed.add(member)
+                    self.numbers.append(member)
+        self.message = message
+        self.attached_file = attached_file
+        self.priority = priority
+        self.start_at = start_at
+        self.deadline = deadline
+        self.windows = windows or []
+        # False for transactional messages: only opt-outs and unregistered numbers are skipped
+        self.skip_contacted = skip_contacted
+        self.pending = deque()
+        # (due, sequence, item, last failed result) for later passes
+        self.retries = []
+        self.attempts = {}
+        # Items whose earlier attempt may have sent the message already
+        self.check_chat = set()
+        self.counts = {}
+        self.processed = 0
+        self.cancelled = False
+        self.in_flight = 0
+        self.turn = 0
+        # Called as on_record(campaign, result) for every final result
+        self.on_record = None
+
+    def ready_at(self, now):
+        """Earliest time at or after `now` this campaign may send, or None if
+        it never can again (no windows open before the deadline)."""
+        moment = max(now, self.start_at or now)
+        if self.windows:
+            opens = [o for o in (w.next_open(moment) for w in self.windows) if o is not None]
+            if not opens:
+                return None
+            moment = min(opens)
+        if self.deadline is not None and moment >= self.deadline:
+            return None
+        return moment
+
+    @staticmethod
+    def recipients(item):
+        """The numbers a queued item reaches."""
+        return item.members if isinstance(item, FanoutTarget) else [item]
+
+    def size(self, items):
+        return sum(len(self.recipients(item)) for item in items)
+
+    @property
+    def state(self):
+        if self.cancelled:
+            return CAMPAIGN_CANCELLED
+        if not self.pending and not self.in_flight and not self.retries:
+            return CAMPAIGN_DONE
+        return CAMPAIGN_ACTIVE if self.processed or self.in_flight else CAMPAIGN_SCHEDULED
+
+    def record(self, result):
+        self.check_chat.discard(result["number"])
+        self.counts[result["status"]] = self.counts.get(result["status"], 0) + 1
+        self.processed += 1
+        if self.on_record is not None:
+            self.on_record(self, result)
+
+    def status(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "priority": self.priority,
+            "total": len(self.numbers),
+            "pending": len(self.pending),
+            "retrying": len(self.retries),
+            "processed": self.processed,
+            "counts": dict(self.counts),
+        }
+
+
+# ------------------- Scheduler -------------------
+class SendScheduler:
+    """Chooses the next contact across all campaigns; safe to feed from other threads.
+
+    With close_when_idle the scheduler reports itself finished once every
+    campaign is done, which is how one-shot runs and GUI runs end; add()
+    then returns False and the caller starts a new sender once the old one
+    has closed its browser. The daemon leaves it off and keeps waiting for
+    new campaigns, with keep_done=False so finished campaigns do not pile up.
+    """
+
+    def __init__(self, close_when_idle=False, retry_policy=None, keep_done=True):
+        self.close_when_idle = close_when_idle
+        self.keep_done = keep_done
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.total = 0
+        self.processed = 0
+        self._cond = threading.Condition()
+        self._campaigns = {}
+        self._turns = itertools.count()
+        self._expired = deque()
+        self._closed = False
+
+    def add(self, campaign, numbers=None):
+        """Queues `numbers` (default: all of the campaign's numbers).
+
+        Returns False if the scheduler already finished, in which case the
+        caller needs a new one.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            items = campaign.numbers if numbers is None else numbers
+            campaign.pending.extend(items)
+            campaign.turn = next(self._turns)
+            self._campaigns[campaign.id] = campaign
+            self.total += campaign.size(items)
+            self._retire(campaign)
+            self._cond.notify_all()
+            return True
+
+    def cancel(self, campaign_id):
+        """Drops the campaign's pending contacts; returns False if it is unknown."""
+        with self._cond:
+            campaign = self._campaigns.get(campaign_id)
+            if campaign is None:
+                return False
+            self.total -= campaign.size(campaign.pending) + campaign.size(entry[2] for entry in campaign.retries)
+            campaign.pending.clear()
+            campaign.retries.clear()
+            campaign.cancelled = True
+            self._cond.notify_all()
+            return True
+
+    def get(self, campaign_id):
+        with self._cond:
+            return self._campaigns.get(campaign_id)
+
+    def campaigns(self):
+        with self._cond:
+            return list(self._campaigns.values())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def next(self, timeout=None):
+        """Blocks until a contact is due and returns (campaign, number or FanoutTarget).
+
+        Returns None on timeout or once the scheduler is finished; check
+        finished() to tell them apart.
+        """
+        wait_until = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._closed:
+                now = time.time()
+                self._release_retries(now)
+                self._expire(now)
+                campaign, wake_at = self._choose(now)
+                if campaign is not None:
+                    campaign.turn = next(self._turns)
+                    campaign.in_flight += 1
+                    return campaign, campaign.pending.popleft()
+                if self._idle() and self.close_when_idle:
+                    self._closed = True
+                    break
+                wait = None if wake_at is None else wake_at - now
+                if wait_until is not None:
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+            return None
+
+    def requeue(self, campaign, number, may_have_sent=False):
+        """Puts a contact back at the head of its campaign (e.g. the session
+        dropped while sending it)."""
+        with self._cond:
+            campaign.in_flight -= 1
+            campaign.pending.appendleft(number)
+            if may_have_sent:
+                campaign.check_chat.add(number)
+            self._cond.notify_all()
+
+    def expand(self, campaign, target):
+        """Puts a fan-out target's members back at the head of its campaign as
+        single contacts (e.g. the list or group does not exist)."""
+        with self._cond:
+            campaign.in_flight -= 1
+            campaign.check_chat.discard(target)
+            campaign.pending.extendleft(reversed(target.members))
+            self._cond.notify_all()
+
+    def retry_later(self, campaign, number, result, may_have_sent=False):
+        """Schedules a failed contact for a later pass.
+
+        Returns the delay in seconds, or None if the contact is out of
+        attempts, in which case the caller records `result` as final.
+        """
+        with self._cond:
+            attempts = campaign.attempts.get(number, 0) + 1
+            delay = self.retry_policy.delay(attempts)
+            if delay is None:
+                campaign.attempts.pop(number, None)
+                return None
+            campaign.attempts[number] = attempts
+            campaign.in_flight -= 1
+            if may_have_sent:
+                campaign.check_chat.add(number)
+            heapq.heappush(campaign.retries, (time.time() + delay, next(self._turns), number, result))
+            self._cond.notify_all()
+            return delay
+
+    def record(self, campaign, result):
+        with self._cond:
+            campaign.in_flight -= 1
+            campaign.record(result)
+            self.processed += 1
+            self._retire(campaign)
+
+    def record_all(self, campaign, item, results):
+        """Records the per-number results of one fan-out item."""
+        with self._cond:
+            campaign.in_flight -= 1
+            campaign.check_chat.discard(item)
+            for result in results:
+                campaign.record(result)
+            self.processed += len(results)
+            self._retire(campaign)
+
+    def pop_expired(self):
+        """Returns (campaign, result) pairs for contacts dropped at their
+        campaign's deadline since the last call; they are already recorded."""
+        with self._cond:
+            expired = list(self._expired)
+            self._expired.clear()
+            return expired
+
+    def finished(self):
+        with self._cond:
+            if not self._closed and self.close_when_idle and self._idle():
+                self._closed = True
+            return self._closed
+
+    def _idle(self):
+        return not self._expired and all(
+            not c.pending and not c.in_flight and not c.retries for c in self._campaigns.values()
+        )
+
+    def _release_retries(self, now):
+        # Due retries join the back of the campaign: they run after its first pass
+        for campaign in self._campaigns.values():
+            while campaign.retries and campaign.retries[0][0] <= now:
+                campaign.pending.append(heapq.heappop(campaign.retries)[2])
+
+    def _expire(self, now):
+        expired = [c for c in self._campaigns.values() if c.deadline is not None and now >= c.deadline]
+        for campaign in expired:
+            # Emptied first so on_record sees the campaign done at its last result
+            pending, retries = list(campaign.pending), campaign.retries
+            campaign.pending.clear()
+            campaign.retries = []
+            for item in pending:
+                for number in campaign.recipients(item):
+                    result = {"number": number, "status": STATUS_EXPIRED, "reason": "Campaign deadline passed"}
+                    campaign.record(result)
+                    self._expired.append((campaign, result))
+                    self.processed += 1
+            # Contacts waiting for a retry keep the failure they already had
+            for _, _, item, failed in retries:
+                for number in campaign.recipients(item):
+                    result = dict(failed, number=number)
+                    campaign.record(result)
+                    self._expired.append((campaign, result))
+                    self.processed += 1
+            self._retire(campaign)
+
+    def _retire(self, campaign):
+        if not self.keep_done and campaign.state == CAMPAIGN_DONE:
+            self._campaigns.pop(campaign.id, None)
+
+    def _choose(self, now):
+        """Returns (campaign due now or None, earliest future wake-up time)."""
+        best = None
+        wake_at = None
+        for campaign in self._campaigns.values():
+            if not campaign.pending:
+                if campaign.retries:
+                    due = campaign.retries[0][0]
+                    if campaign.deadline is not None:
+                        due = min(due, campaign.deadline)
+                    wake_at = due if wake_at is None else min(wake_at, due)
+                continue
+            ready = campaign.ready_at(now)
+            if ready is None:
+                # No window opens before the deadline: wake up to expire it
+                ready = campaign.deadline
+                if ready is None:
+                    continue
+            if ready > now:
+                wake_at = ready if wake_at is None else min(wake_at, ready)
+            elif best is None or (campaign.priority, campaign.turn) < (best.priority, best.turn):
+                best = campaign
+        return best, wake_at
@@ -0,0 +1,1224 @@
+import sys
+import os
+import platform
+import subprocess
+import requests
+import zipfile
+import tarfile
+import stat
+import time
+import random
+import urllib.parse
+import logging
+import re
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import WebDriverException, TimeoutException
+from log_setup import ContextAdapter
+from timeouts import AdaptiveTimeouts
+from waits import DomWaiter, PRESENT, VISIBLE, ABSENT
+from session_watchdog import (
+    HEALTHY, DISCONNECTED, LOGGED_OUT, CircuitBreaker, SessionWatchdog,
+    LoginRequired, probe_session, force_close
+)
+from suppression import REASON_SENT, REASON_NOT_REGISTERED, validate_numbers
+from planner import prepare_send
+from send_queue import Campaign, SendScheduler
+from broadcast import (
+    FanoutTarget, TargetNotFoundError, STATUS_UNCONFIRMED, SEARCH_BOX_XPATH, search_result_xpath,
+    chat_header_xpath
+)
+from session_recycler import SessionRecycler, RECYCLE_DRIVER
+from results_store import ResultStore
+
+# ------------------- Configuration -------------------
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+WHATSAPP_WEB_URL = "https://web.whatsapp.com"
+SUPPORTED_BROWSERS = ("Chrome", "Firefox", "Brave", "Edge")
+
+# Campaign outcomes reported by CampaignSender.run()
+OUTCOME_COMPLETED = "completed"
+OUTCOME_STOPPED = "stopped"
+OUTCOME_LOGIN_REQUIRED = "login_required"
+OUTCOME_ERROR = "error"
+
+STATUS_NOT_ON_WHATSAPP = "Not on WhatsApp"
+
+SUPPRESSION_REASONS = {
+    "sent": "Already contacted",
+    "opt_out": "Opted out",
+    "not_registered": "Not on WhatsApp",
+}
+
+# ------------------- Page Locators -------------------
+QR_CODE_XPATH = '//div[@data-testid="qrcode"]'
+SIDE_PANEL_XPATH = '//*[@id="side"]'
+MESSAGE_BOX_XPATH = '//div[contains(@class, "copyable-text") and @role="textbox"]'
+CHAT_PANEL_XPATH = '//div[@data-testid="conversation-panel-body"]'
+CONTINUE_BUTTON_XPATH = '//div[@role="button" and contains(text(), "use WhatsApp Web")]'
+# "WhatsApp is open in another window" screen
+USE_HERE_XPATH = '//*[(self::button or @role="button") and contains(., "Use here")]'
+SEND_BUTTON_XPATH = '//button[contains(@data-testid,"send") and @aria-label="Send"]'
+EMPTY_MESSAGE_BOX_XPATH = MESSAGE_BOX_XPATH + '[not(normalize-space())]'
+ATTACH_BUTTON_XPATH = '//div[@title="Attach"]'
+FILE_INPUT_XPATH = '//input[@accept="*"]'
+ATTACH_PREVIEW_XPATH = '//div[@data-testid="media-attach-preview"]'
+NOTIFICATION_XPATH = '//div[contains(text(), "Your computer is")]'
+DIALOG_XPATH = '//div[@role="dialog"]'
+DELIVERED_XPATH = '//span[@data-icon="msg-dblcheck"]'
+SEND_FAILED_XPATH = '//div[contains(text(), "couldn\'t send")]'
+MESSAGE_CONTAINER_XPATH = '//div[@data-testid="msg-container"]'
+# "Phone number shared via url is invalid." (English and Arabic UI)
+INVALID_NUMBER_XPATH = (
+    '//div[@role="dialog"]//*[contains(text(), "shared via url is invalid") '
+    'or contains(text(), "غير صالح")]'
+)
+# Raced in order (see waits.py) while WhatsApp Web starts
+STARTUP_STATES = [
+    ["login", QR_CODE_XPATH],
+    ["ready", SIDE_PANEL_XPATH],
+    ["use_here", USE_HERE_XPATH],
+]
+# Raced in order after opening a chat link
+CHAT_STATES = [
+    ["invalid", INVALID_NUMBER_XPATH],
+    ["ready", CHAT_PANEL_XPATH],
+    ["continue", CONTINUE_BUTTON_XPATH],
+]
+# How long a closed popup may take to leave the page
+POPUP_CLOSE_TIMEOUT = 3
+# Whether one of the last outgoing bubbles already holds the message and
+# has left the phone (a sent or delivered tick; pending and "couldn't send"
+# bubbles do not count). Formatting markers are stripped since the chat
+# renders them as styles.
+MESSAGE_IN_CHAT_JS = """
+var normalize = function (text) { return text.replace(/[*_~`]/g, "").replace(/\\s+/g, " ").trim(); };
+var expected = normalize(arguments[0]);
+var ticks = '[data-icon="msg-check"], [data-icon="msg-dblcheck"], [data-icon="msg-dblcheck-ack"]';
+var bubbles = document.querySelectorAll("div.message-out");
+for (var i = bubbles.length - 1; i >= 0 && i >= bubbles.length - arguments[1]; i--) {
+    var text = bubbles[i].querySelector("span.selectable-text");
+    if (text && normalize(text.innerText) === expected && bubbles[i].querySelector(ticks)) { return true; }
+}
+return false;
+"""
+# Steps after which the message may have left even though the contact failed
+SENT_MAYBE_STEPS = ("send", "verify", "pacing")
+# A contact that loses the session this many times is blamed for it and
+# recorded as failed (kept below CircuitBreaker.max_attempts)
+MAX_SESSION_LOSSES = 2
+
+logger = logging.getLogger("wasender.sender")
+
+
+class NotOnWhatsAppError(Exception):
+    pass
+
+
+class DeliveryError(Exception):
+    """WhatsApp did not confirm the message; worth another pass later."""
+    pass
+
+
+def is_transient(error):
+    """Timeouts, driver hiccups and unconfirmed deliveries may succeed on a
+    later pass; anything else (invalid number, bad attachment) will not."""
+    return isinstance(error, (WebDriverException, DeliveryError))
+
+# ------------------- Dependency Installer -------------------
+class DependencyInstaller:
+    def __init__(self):
+        self.system = platform.system().lower()
+        self.arch = platform.machine().lower()
+        self.driver_dir = os.path.join(os.getcwd(), "drivers")
+        os.makedirs(self.driver_dir, exist_ok=True)
+        self.browser_paths = self._detect_browsers()
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+
+    def _detect_browsers(self):
+        browsers = {
+            "chrome": self._get_browser_path("chrome"),
+            "firefox": self._get_browser_path("firefox"),
+            "brave": self._get_browser_path("brave"),
+            "edge": self._get_browser_path("edge")
+        }
+        return {k: v for k, v in browsers.items() if v and os.path.exists(v)}
+
+    def _get_browser_path(self, browser_name):
+        if self.system == "windows":
+            paths = {
+                "chrome": os.path.join(os.getenv("ProgramFiles"), "Google", "Chrome", "Application", "chrome.exe"),
+                "firefox": os.path.join(os.getenv("ProgramFiles"), "Mozilla Firefox", "firefox.exe"),
+                "brave": os.path.join(os.getenv("ProgramFiles"), "BraveSoftware", "Brave-Browser", "Application", "brave.exe"),
+                "edge": os.path.join(os.getenv("ProgramFiles(x86)"), "Microsoft", "Edge", "Application", "msedge.exe")
+            }
+        elif self.system == "linux":
+            paths = {
+                "chrome": "/usr/bin/google-chrome",
+                "firefox": "/usr/bin/firefox",
+                "brave": "/usr/bin/brave-browser",
+                "edge": "/usr/bin/microsoft-edge"
+            }
+        elif self.system == "darwin":
+            paths = {
+                "chrome": "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                "firefox": "/Applications/Firefox.app/Contents/MacOS/firefox",
+                "brave": "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser",
+                "edge": "/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge"
+            }
+        return paths.get(browser_name)
+
+    def _get_chrome_version(self):
+        """Retrieves the installed Chrome version."""
+        chrome_path = self.browser_paths.get("chrome")
+        if not chrome_path:
+            logging.error("Chrome browser path not found.")
+            return None
+
+        try:
+            if self.system == "windows":
+                # Try registry first
+                try:
+                    import winreg
+                    reg_path = r'SOFTWARE\Google\Chrome\BLBeacon'
+                    with winreg.OpenKey(winreg.HKEY_CURRENT_USER, reg_path) as key:
+                        version, _ = winreg.QueryValueEx(key, 'version')
+                        return version
+                except Exception as e:
+                    logging.warning(f"Registry read failed: {e}. Trying file version...")
+                    # Fallback to PowerShell command
+                    command = f'(Get-Item "{chrome_path}").VersionInfo.FileVersion'
+                    result = subprocess.run(["powershell", "-Command", command], 
+                                          capture_output=True, text=True, check=True)
+                    return result.stdout.strip()
+            elif self.system == "linux":
+                result = subprocess.run([chrome_path, "--version"], 
+                                      capture_output=True, text=True, check=True)
+                return result.stdout.strip().split()[-1]
+            elif self.system == "darwin":
+                # Check Info.plist
+                plist_path = os.path.join(os.path.dirname(chrome_path), '..', 'Info.plist')
+                plist_path = os.path.abspath(plist_path)
+                with open(plist_path, 'rb') as f:
+                    content = f.read().decode('utf-8', errors='ignore')
+                    match = re.search(r'<key>CFBundleShortVersionString</key>\s*<string>([\d.]+)</string>', content)
+                    if match:
+                        return match.group(1)
+                # Fallback to mdls
+                result = subprocess.run(['mdls', '-name', 'kMDItemVersion', chrome_path], 
+                                      capture_output=True, text=True, check=True)
+                return result.stdout.split('"')[1]
+            else:
+                return None
+        except Exception as e:
+            logging.error(f"Error getting Chrome version: {e}")
+            return None
+
+    def _get_chrome_platform(self):
+        """Determines platform string for ChromeDriver download."""
+        if self.system == "windows":
+            return "win64" if self.arch == "amd64" else "win32"
+        elif self.system == "linux":
+            return "linux64" if self.arch == "x86_64" else "linux32"
+        elif self.system == "darwin":
+            return "mac-arm64" if self.arch == "arm64" else "mac-x64"
+        else:
+            return None
+
+    def is_python_package_installed(self, package_name):
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "show", package_name],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    def install_python_packages(self):
+        packages = ["selenium", "pygame", "xlsxwriter", "PyQt5", "phonenumbers"]
+        for package in packages:
+            if not self.is_python_package_installed(package):
+                try:
+                    subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+                    logging.info(f"Successfully installed {package}.")
+                except subprocess.CalledProcessError as e:
+                    logging.error(f"Failed to install {package}: {e}")
+
+    def _download_file(self, url, destination):
+        try:
+            response = self.session.get(url, stream=True, timeout=30)
+            response.raise_for_status()
+            with open(destination, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            logging.info(f"Downloaded {os.path.basename(destination)}")
+            return True
+        except Exception as e:
+            logging.error(f"Download failed: {e}")
+            return False
+
+    def _extract_archive(self, file_path, target_dir):
+        try:
+            if file_path.endswith(".zip"):
+                with zipfile.ZipFile(file_path, "r") as zip_ref:
+                    zip_ref.extractall(target_dir)
+            elif file_path.endswith(".tar.gz"):
+                with tarfile.open(file_path, "r:gz") as tar_ref:
+                    tar_ref.extractall(target_dir)
+            return True
+        except Exception as e:
+            logging.error(f"Extraction failed: {e}")
+            return False
+
+    def _install_driver(self, driver_name, download_url, file_pattern):
+        driver_path = os.path.join(self.driver_dir, driver_name)
+        if os.path.exists(driver_path):
+            logging.info(f"{driver_name} already installed")
+            return True
+
+        try:
+            temp_file = os.path.join(self.driver_dir, f"temp_{driver_name}.zip")
+            if not self._download_file(download_url, temp_file):
+                return False
+
+            if not self._extract_archive(temp_file, self.driver_dir):
+                return False
+
+            # Handle nested directories in archives
+            for root, dirs, files in os.walk(self.driver_dir):
+                for file in files:
+                    if file.lower().startswith(file_pattern):
+                        os.rename(os.path.join(root, file), driver_path)
+                        break
+
+            if self.system != "windows":
+                os.chmod(driver_path, stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+            os.remove(temp_file)
+            logging.info(f"{driver_name} installed successfully")
+            return True
+        except Exception as e:
+            logging.error(f"Installation failed: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+
+    def install_chromedriver(self):
+        driver_name = "chromedriver.exe" if self.system == "windows" else "chromedriver"
+        driver_path = os.path.join(self.driver_dir, driver_name)
+        
+        # Remove existing driver if outdated
+        if os.path.exists(driver_path):
+            try:
+                version_output = subprocess.check_output([driver_path, "--version"]).decode()
+                if "ChromeDriver 1" in version_output:
+                    os.remove(driver_path)
+            except:
+                pass
+
+        if os.path.exists(driver_path):
+            logging.info("ChromeDriver already installed")
+            return True
+
+        chrome_version = self._get_chrome_version()
+        if not chrome_version:
+            logging.error("Could not detect Chrome version.")
+            return False
+
+        platform = self._get_chrome_platform()
+        if not platform:
+            logging.error("Unsupported platform.")
+            return False
+
+        driver_url = f"https://storage.googleapis.com/chrome-for-testing-public/{chrome_version}/{platform}/chromedriver-{platform}.zip"
+        logging.info(f"Downloading ChromeDriver {chrome_version} for {platform}")
+
+        return self._install_driver(driver_name, driver_url, "chromedriver")
+
+    def install_geckodriver(self):
+        if "firefox" not in self.browser_paths:
+            logging.warning("Firefox not found, skipping GeckoDriver installation")
+            return
+
+        try:
+            response = self.session.get(
+                "https://api.github.com/repos/mozilla/geckodriver/releases/latest"
+            )
+            response.raise_for_status()
+            version = response.json()["tag_name"]
+
+            os_map = {
+                "windows": "win64",
+                "linux": "linux64",
+                "darwin": "macos"
+            }
+            extension = "zip" if self.system == "windows" else "tar.gz"
+            driver_url = f"https://github.com/mozilla/geckodriver/releases/download/{version}/geckodriver-{version}-{os_map[self.system]}.{extension}"
+
+            return self._install_driver(
+                "geckodriver.exe" if self.system == "windows" else "geckodriver",
+                driver_url,
+                "geckodriver"
+            )
+        except Exception as e:
+            logging.error(f"GeckoDriver installation failed: {e}")
+            return False
+
+    def install_edgedriver(self):
+        if "edge" not in self.browser_paths:
+            logging.warning("Edge not found, skipping EdgeDriver installation")
+            return
+
+        try:
+            # Use direct latest stable version URL
+            driver_url = "https://msedgedriver.azureedge.net/LATEST_STABLE"
+            response = self.session.get(driver_url)
+            response.raise_for_status()
+            version = response.text.strip()
+
+            os_map = {
+                "windows": "win64",
+                "linux": "linux64",
+                "darwin": "mac64"
+            }
+            driver_url = f"https://msedgedriver.azureedge.net/{version}/edgedriver_{os_map[self.system]}.zip"
+
+            return self._install_driver(
+                "msedgedriver.exe" if self.system == "windows" else "msedgedriver",
+                driver_url,
+                "msedgedriver"
+            )
+        except Exception as e:
+            logging.error(f"EdgeDriver installation failed: {e}")
+            return False
+
+    def install_all(self):
+        logging.info("Checking Python packages...")
+        self.install_python_packages()
+        logging.info("Checking ChromeDriver...")
+        self.install_chromedriver()
+        logging.info("Checking GeckoDriver...")
+        self.install_geckodriver()
+        logging.info("Checking EdgeDriver...")
+        self.install_edgedriver()
+        logging.info("Dependency check completed")
+
+
+# ------------------- Sender Events -------------------
+class SenderEvents:
+    """Receives campaign progress; front ends override the hooks they need."""
+
+    def sent(self, info):
+        pass
+
+    def progress(self, percent):
+        pass
+
+    def error(self, message):
+        """Fatal campaign error; the run stops after this."""
+        pass
+
+    def paused(self, reason):
+        """The session is unhealthy; sending waits while it is recovered."""
+        pass
+
+    def resumed(self):
+        pass
+
+    def login_required(self):
+        pass
+
+    def finished(self):
+        pass
+
+
+# ------------------- Campaign Sender -------------------
+class CampaignSender:
+    """Drives WhatsApp Web through Selenium for one list of numbers.
+
+    Has no GUI dependencies: progress goes to a SenderEvents sink and the
+    caller decides when to stop through the should_continue callable.
+    With a SendScheduler, run() instead sends whatever campaigns are queued
+    on it (see enqueue()), highest priority first.
+    """
+
+    def __init__(self, numbers, message, attached_file, browser, delay, driver_dir,
+                 browser_paths=None, events=None, should_continue=None,
+                 pacing=(2, 5), headless=False, profile_dir=None, screenshot_dir=None,
+                 campaign_id=None, suppression=None, timeouts=None,
+                 stall_timeout=300, disconnect_grace=120, login_wait=600, scheduler=None,
+                 recycle_policy=None):
+        if browser not in SUPPORTED_BROWSERS:
+            raise ValueError(f"Unsupported browser: {browser}")
+        self.numbers = numbers
+        self.message = message
+        self.attached_file = attached_file
+        self.browser = browser
+        self.delay = delay
+        self.driver_dir = driver_dir
+        self.browser_paths = browser_paths or {}
+        self.events = events or SenderEvents()
+        self.should_continue = should_continue or (lambda: True)
+        self.pacing = pacing
+        self.headless = headless
+        self.profile_dir = profile_dir or os.path.join(os.getcwd(), "chrome_profile")
+        self.screenshot_dir = screenshot_dir
+        self.driver = None
+        self.results = ResultStore()
+        self.outcome = None
+        self.step = None
+        self.log = ContextAdapter(logger, {"campaign": campaign_id})
+        self.suppression = suppression
+        self.timeouts = timeouts or AdaptiveTimeouts()
+        self.breaker = CircuitBreaker()
+        # Contact -> times it failed because the session went down
+        self._session_losses = {}
+        self.stall_timeout = stall_timeout
+        self.disconnect_grace = disconnect_grace
+        self.login_wait = login_wait
+        self.watchdog = None
+        self._waiter = None
+        self.scheduler = scheduler
+        # Only Chrome and Brave keep the login in a profile across driver restarts
+        self.recycler = SessionRecycler(recycle_policy, can_restart_driver=browser in ("Chrome", "Brave"))
+        self.supported_files = ('.jpg', '.jpeg', '.png', '.pdf', '.docx', '.txt', '.zip')
+        self.retry_count = 3
+
+    def validate_file(self, attached_file):
+        if attached_file:
+            if not os.path.exists(attached_file):
+                raise FileNotFoundError("Attached file not found")
+            if not attached_file.lower().endswith(self.supported_files):
+                raise ValueError(f"Unsupported file type: {os.path.splitext(attached_file)[1]}")
+        return True
+
+    def validate_numbers(self, numbers):
+        validate_numbers(numbers)
+
+    def _dom_waiter(self):
+        # The driver is replaced on recovery and recycling
+        if self._waiter is None or self._waiter.driver is not self.driver:
+            self._waiter = DomWaiter(self.driver)
+        return self._waiter
+
+    def _wait_for(self, step, conditions, optional=False):
+        """Event-driven wait (see waits.py) with the adaptive timeout for
+        `step`, recording how long it took. Returns (name, element) of the
+        first condition that held. Optional waits (popups) do not count
+        their timeouts, since not appearing is the normal case."""
+        started = time.monotonic()
+        try:
+            result = self._dom_waiter().first(conditions, self.timeouts.timeout(step))
+        except TimeoutException:
+            if not optional:
+                self.timeouts.timed_out(step)
+            raise
+        self.timeouts.observe(step, time.monotonic() - started)
+        return result
+
+    def _wait_until(self, step, xpath, mode=PRESENT, optional=False):
+        return self._wait_for(step, [[step, xpath, mode]], optional)[1]
+
+    def _wait_gone(self, xpath, timeout):
+        """Waits briefly for an element to leave the page; not an error if it stays."""
+        try:
+            self._dom_waiter().until(xpath, timeout, ABSENT)
+        except TimeoutException:
+            pass
+
+    def _ensure_element_ready(self, xpath, step="compose_ready"):
+        return self._wait_until(step, xpath, VISIBLE)
+
+    def _safe_clear_input(self, element):
+        for _ in range(3):
+            element.send_keys(Keys.BACKSPACE)
+        self.driver.execute_script("arguments[0].value = '';", element)
+        element.send_keys(' ')
+        element.send_keys(Keys.BACKSPACE)
+        # Ready to type once the editor has actually emptied
+        try:
+            self._dom_waiter().until(EMPTY_MESSAGE_BOX_XPATH, 1)
+        except TimeoutException:
+            pass
+
+    def _handle_popups(self):
+        # Popups that have not shown up for a while are only probed occasionally
+        if self.timeouts.should_probe("popup_notification"):
+            try:
+                # Handle "Your computer is..." notification
+                notification = self._wait_until("popup_notification", NOTIFICATION_XPATH, optional=True)
+                self.timeouts.popup_result("popup_notification", True)
+                close_btn = notification.find_element(By.XPATH, './following-sibling::div')
+                close_btn.click()
+                self._wait_gone(NOTIFICATION_XPATH, POPUP_CLOSE_TIMEOUT)
+            except TimeoutException:
+                self.timeouts.popup_result("popup_notification", False)
+            except WebDriverException:
+                pass
+
+        if self.timeouts.should_probe("popup_dialog"):
+            try:
+                self._wait_until("popup_dialog", DIALOG_XPATH, optional=True)
+                self.timeouts.popup_result("popup_dialog", True)
+                close_buttons = self.driver.find_elements(
+                    By.XPATH, DIALOG_XPATH + '//button[@aria-label="Close"]'
+                )
+                if close_buttons:
+                    close_buttons[0].click()
+                    self._wait_gone(DIALOG_XPATH, POPUP_CLOSE_TIMEOUT)
+            except TimeoutException:
+                self.timeouts.popup_result("popup_dialog", False)
+            except WebDriverException:
+                pass
+
+    def _retry_operation(self, operation, max_retries=3):
+        for attempt in range(max_retries):
+            try:
+                return operation()
+            except WebDriverException as e:
+                if attempt < max_retries - 1:
+                    sleep_time = 2 ** attempt
+                    self.log.warning("Retrying in %ss... (%s)", sleep_time, e, extra={"step": self.step})
+                    time.sleep(sleep_time)
+                else:
+                    raise
+
+    def _driver_path(self):
+        driver_name = {
+            "Chrome": "chromedriver",
+            "Brave": "chromedriver",
+            "Firefox": "geckodriver",
+            "Edge": "msedgedriver"
+        }[self.browser]
+        return os.path.join(self.driver_dir, driver_name + (".exe" if os.name == "nt" else ""))
+
+    def open_session(self):
+        """Starts the browser and waits for WhatsApp Web to load.
+
+        Returns False when the profile is not logged in (QR code shown).
+        """
+        driver_path = self._driver_path()
+        if not os.path.exists(driver_path):
+            raise FileNotFoundError(f"Driver not found: {driver_path}")
+
+        options = self._get_browser_options()
+        self.driver = self._create_driver(driver_path, options)
+        self.recycler.reset(RECYCLE_DRIVER)
+
+        self._retry_operation(
+            lambda: self.driver.get(WHATSAPP_WEB_URL)
+        )
+
+        return not self._check_login_required()
+
+    def close_session(self):
+        self.stop_watchdog()
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                self.log.warning("Error closing browser: %s", e)
+            self.driver = None
+
+    def start_watchdog(self):
+        if self.watchdog is None and self.stall_timeout:
+            self.watchdog = SessionWatchdog(lambda: self.driver, self.stall_timeout)
+            self.watchdog.start()
+
+    def stop_watchdog(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    def maybe_recycle(self):
+        """Recycles the tab or the driver if the recycler asks for it.
+
+        Call between contacts only. A failed recycle still counts as one, so
+        the next boundary does not retry it straight away and repeated tab
+        failures escalate to a driver restart. Call it before ensure_session(),
+        which repairs a session the recycle left broken (or without a driver).
+        """
+        if self.driver is None:
+            return
+        decision = self.recycler.check(self.driver)
+        if decision is None:
+            return
+        action, reason = decision
+        self.log.info("Recycling the browser %s: %s", action, reason, extra={"step": "recycle"})
+        try:
+            if action == RECYCLE_DRIVER:
+                force_close(self.driver)
+                self.driver = None
+                self.open_session()
+            else:
+                self._recycle_tab()
+        except Exception as e:
+            self.log.warning("Browser recycle failed: %s", e, extra={"step": "recycle"})
+        finally:
+            self.recycler.reset(action)
+
+    def _recycle_tab(self):
+        # A new tab gets a fresh renderer; closing the old one frees its heap
+        # and DOM. WhatsApp Web is only loaded once the old tab is gone, or
+        # it would show its "open in another window" screen.
+        old_tab = self.driver.current_window_handle
+        self.driver.switch_to.new_window("tab")
+        new_tab = self.driver.current_window_handle
+        self.driver.switch_to.window(old_tab)
+        self.driver.close()
+        self.driver.switch_to.window(new_tab)
+        self.driver.get(WHATSAPP_WEB_URL)
+        self._check_login_required()
+
+    def ensure_session(self):
+        """Blocks until the session is healthy, recovering it if needed.
+
+        Returns False if the caller asked to stop while sending was paused.
+        Raises SessionUnrecoverable (LoginRequired for a logout) when the
+        circuit breaker gives up.
+        """
+        state = probe_session(self.driver)
+        if state == HEALTHY:
+            return True
+        self.breaker.open(state)
+        self.log.warning("Session %s, pausing the queue", state, extra={"step": "recover"})
+        self.events.paused(state)
+        while state != HEALTHY:
+            if not self.should_continue():
+                return False
+            delay = self.breaker.next_delay()
+            if delay and not self._pause(delay):
+                return False
+            state = self._recover(state)
+        self.breaker.close()
+        self.log.info("Session recovered, resuming", extra={"step": "recover"})
+        self.events.resumed()
+        return True
+
+    def _recover(self, state):
+        if state == DISCONNECTED:
+            # Connectivity banners usually clear once the phone is back
+            state = self._wait_for_health(self.disconnect_grace)
+            if state == DISCONNECTED:
+                self.log.warning("Still disconnected, reloading WhatsApp Web", extra={"step": "recover"})
+                try:
+                    self.driver.get(WHATSAPP_WEB_URL)
+                    self._check_login_required()
+                except Exception as e:
+                    self.log.warning("Reload failed: %s", e, extra={"step": "recover"})
+                state = probe_session(self.driver)
+            return state
+        if state == LOGGED_OUT:
+            self.log.warning("WhatsApp Web logged out, waiting for the QR code to be scanned",
+                             extra={"step": "recover"})
+            state = self._wait_for_health(self.login_wait)
+            if state == LOGGED_OUT:
+                raise LoginRequired("WhatsApp Web session logged out")
+            return state
+        # Dead browser or WebDriver session: start over from the persistent profile
+        self.log.warning("Browser session lost, restarting the driver", extra={"step": "recover"})
+        if self.driver is not None:
+            force_close(self.driver)
+            self.driver = None
+        try:
+            self.open_session()
+        except Exception as e:
+            self.log.warning("Driver restart failed: %s", e, extra={"step": "recover"})
+        return probe_session(self.driver)
+
+    def _wait_for_health(self, timeout, interval=5):
+        deadline = time.monotonic() + timeout
+        state = probe_session(self.driver)
+        while state != HEALTHY and time.monotonic() < deadline and self._pause(interval):
+            state = probe_session(self.driver)
+        return state
+
+    def _pause(self, seconds):
+        """Sleeps in short steps; returns False as soon as a stop is requested."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if not self.should_continue():
+                return False
+            time.sleep(min(1, max(0, deadline - time.monotonic())))
+        return True
+
+    def send(self, number, message, attached_file=None, check_chat=False):
+        """Sends one message and returns its result record; never raises.
+
+        With check_chat the chat is searched for the message first and it is
+        not sent again if found (an earlier attempt may have delivered it).
+        A failed result carries "transient" (worth retrying) and the "step"
+        it failed at.
+        """
+        result = {"number": number, "status": "Failed", "reason": ""}
+        started = time.monotonic()
+        if self.watchdog is not None:
+            self.watchdog.contact_started()
+        try:
+            self._process_number(number, message, attached_file, check_chat)
+            result["status"] = "Success"
+            self.breaker.record_success()
+            self.recycler.contact_done(time.monotonic() - started, True)
+            self.log.info("Sent to %s", number, extra={
+                "number": number, "step": "sent", "status": "Success",
+                "duration": round(time.monotonic() - started, 3)
+            })
+            if self.suppression is not None:
+                self.suppression.add([number], REASON_SENT)
+        except NotOnWhatsAppError as e:
+            # A definite answer from WhatsApp: no screenshot, and remembered
+            # so later campaigns skip the number without opening it.
+            self.recycler.contact_done(time.monotonic() - started, False)
+            result["status"] = STATUS_NOT_ON_WHATSAPP
+            result["reason"] = str(e)
+            self.log.warning("%s is not on WhatsApp", number, extra={
+                "number": number, "step": self.step, "status": STATUS_NOT_ON_WHATSAPP,
+                "duration": round(time.monotonic() - started, 3)
+            })
+            if self.suppression is not None:
+                self.suppression.add([number], REASON_NOT_REGISTERED)
+        except Exception as e:
+            self.recycler.contact_done(time.monotonic() - started, False)
+            result["reason"] = str(e)
+            result["transient"] = is_transient(e)
+            result["step"] = self.step
+            self.log.error("Error sending to %s at %s: %s", number, self.step, e, extra={
+                "number": number, "step": self.step, "status": "Failed",
+                "duration": round(time.monotonic() - started, 3)
+            })
+            self._save_error_screenshot(number)
+        finally:
+            if self.watchdog is not None:
+                self.watchdog.contact_finished()
+        return result
+
+    def send_to_target(self, target, message, attached_file=None, check_chat=False):
+        """Sends one message to a broadcast list or group; like send(), the
+        result has the target as its "number" and is expanded to one
+        (unconfirmed) result per member when it is recorded. Members are not
+        added to the suppression index: the page does not show who actually
+        received a broadcast. A missing chat sets "target_missing"."""
+        result = {"number": target, "status": "Failed", "reason": ""}
+        started = time.monotonic()
+        if self.watchdog is not None:
+            self.watchdog.contact_started()
+        try:
+            self._process_target(target, message, attached_file, check_chat)
+            result["status"] = "Success"
+            result["reason"] = f"Sent via {target}"
+            self.breaker.record_success()
+            self.recycler.contact_done(time.monotonic() - started, True)
+            self.log.info("Sent to %s (%s members)", target, len(target), extra={
+                "number": str(target), "step": "sent", "status": "Success",
+                "duration": round(time.monotonic() - started, 3)
+            })
+        except TargetNotFoundError as e:
+            result["reason"] = str(e)
+            result["target_missing"] = True
+            self.log.warning("%s, sending to its members one by one", e, extra={
+                "number": str(target), "step": self.step, "status": "Failed"
+            })
+        except Exception as e:
+            self.recycler.contact_done(time.monotonic() - started, False)
+            result["reason"] = str(e)
+            result["transient"] = is_transient(e)
+            result["step"] = self.step
+            self.log.error("Error sending to %s at %s: %s", target, self.step, e, extra={
+                "number": str(target), "step": self.step, "status": "Failed",
+                "duration": round(time.monotonic() - started, 3)
+            })
+            self._save_error_screenshot(target.kind)
+        finally:
+            if self.watchdog is not None:
+                self.watchdog.contact_finished()
+        return result
+
+    def session_failed(self, result):
+        """True when a failed contact was caused by the session rather than
+        the number, in which case the contact should be retried after
+        ensure_session() instead of being recorded.
+
+        A contact whose chat keeps taking the session down is not retried
+        forever: after MAX_SESSION_LOSSES it is turned into a final,
+        non-transient failure and this returns False.
+        """
+        number = result["number"]
+        if result["status"] != "Failed" or probe_session(self.driver) == HEALTHY:
+            self._session_losses.pop(number, None)
+            return False
+        losses = self._session_losses.get(number, 0) + 1
+        if losses < MAX_SESSION_LOSSES:
+            self._session_losses[number] = losses
+            return True
+        self._session_losses.pop(number, None)
+        self.log.error("Giving up on %s: the session was lost %s times while sending to it", number, losses,
+                       extra={"number": str(number), "step": result.get("step")})
+        result["reason"] = f"Abandoned after losing the session {losses} times: {result['reason']}"
+        result["transient"] = False
+        return False
+
+    @staticmethod
+    def may_have_sent(result):
+        return result.get("step") in SENT_MAYBE_STEPS
+
+    def enqueue(self, campaign):
+        """Validates a campaign, drops suppressed numbers and queues the rest.
+
+        Raises OSError/ValueError for a bad attachment or number. Returns
+        False if the scheduler has already finished.
+        """
+        self.validate_file(campaign.attached_file)
+        selected, fanout = prepare_send(campaign.numbers, self.suppression, campaign.targets,
+                                        campaign.skip_contacted)
+        self._record_suppressed(campaign, selected)
+        for target in fanout.fallbacks:
+            self.log.warning("Not using %s: some members are suppressed, sending to the rest one by one",
+                             target, extra={"campaign": campaign.name})
+        return self.scheduler.add(campaign, fanout.items)
+
+    def run(self):
+        try:
+            if self.scheduler is None:
+                self.scheduler = SendScheduler(close_when_idle=True)
+                self.enqueue(Campaign(self.numbers, self.message, self.attached_file,
+                                      name=self.log.extra["campaign"]))
+            if self.scheduler.finished():
+                # Everything was suppressed: no need to open a browser
+                self.outcome = OUTCOME_COMPLETED
+                self.events.finished()
+                return self.results
+
+            if not self.open_session():
+                self.outcome = OUTCOME_LOGIN_REQUIRED
+                self.events.login_required()
+                return self.results
+            self.start_watchdog()
+
+            self.outcome = OUTCOME_COMPLETED
+            while True:
+                if not self.should_continue():
+                    self.outcome = OUTCOME_STOPPED
+                    break
+                # Short timeout so a stop request is noticed while waiting for a schedule
+                item = self.scheduler.next(timeout=1)
+                self._report_expired()
+                if item is None:
+                    if self.scheduler.finished():
+                        break
+                    continue
+
+                campaign, number = item
+                self.log.extra["campaign"] = campaign.name
+                # Recycle first: a failed driver restart is repaired by ensure_session()
+                self.maybe_recycle()
+                if not self.ensure_session():
+                    self.scheduler.requeue(campaign, number)
+                    self.outcome = OUTCOME_STOPPED
+                    break
+                send = self.send_to_target if isinstance(number, FanoutTarget) else self.send
+                result = send(number, campaign.message, campaign.attached_file,
+                              check_chat=number in campaign.check_chat)
+                if result.get("target_missing"):
+                    self.scheduler.expand(campaign, number)
+                    continue
+                if self.session_failed(result):
+                    # Not the number's fault: resume at the same contact once recovered
+                    self.scheduler.requeue(campaign, number, self.may_have_sent(result))
+                    continue
+                if result.get("transient"):
+                    delay = self.scheduler.retry_later(campaign, number, result, self.may_have_sent(result))
+                    if delay is not None:
+                        self.log.info("Retrying %s in a later pass (in %ss)", number, delay,
+                                      extra={"number": str(number), "step": result["step"]})
+                        continue
+                self._update_progress(campaign, number, result)
+
+            self.events.finished()
+        except LoginRequired as e:
+            self.outcome = OUTCOME_LOGIN_REQUIRED
+            self.log.error(str(e))
+            self.events.login_required()
+        except Exception as e:
+            self.outcome = OUTCOME_ERROR
+            self.events.error(str(e))
+        finally:
+            self.close_session()
+            if self.suppression is not None:
+                self.suppression.flush()
+            self.save_timeouts()
+        return self.results
+
+    def save_timeouts(self):
+        try:
+            self.timeouts.save()
+        except OSError as e:
+            self.log.warning("Could not save learned timeouts: %s", e)
+
+    def _record_suppressed(self, campaign, filtered):
+        """Keeps the numbers prepare_send() dropped in the results as
+        "Suppressed", so reports stay complete."""
+        skipped = []
+        for number, reason in filtered.suppressed:
+            skipped.append({
+                "number": number, "status": "Suppressed", "reason": SUPPRESSION_REASONS.get(reason, reason)
+            })
+        for number in filtered.duplicates:
+            skipped.append({"number": number, "status": "Suppressed", "reason": "Duplicate in list"})
+        if skipped:
+            self.log.info("Suppressed %s of %s numbers", len(skipped), len(campaign.numbers),
+                          extra={"campaign": campaign.name})
+        for result in skipped:
+            campaign.record(result)
+        self.results.extend(skipped, campaign.name)
+
+    def _save_error_screenshot(self, number):
+        # Best effort: after a crash or a watchdog close there may be no
+        # driver, or calls fail below Selenium (urllib3 connection errors)
+        if self.driver is None:
+            return
+        file_name = f"error_{number}_{time.time()}.png"
+        if self.screenshot_dir:
+            os.makedirs(self.screenshot_dir, exist_ok=True)
+            file_name = os.path.join(self.screenshot_dir, file_name)
+        try:
+            self.driver.save_screenshot(file_name)
+        except Exception as e:
+            self.log.warning("Could not save screenshot for %s: %s", number, e, extra={"number": number})
+
+    def _get_browser_options(self):
+        options_map = {
+            "Chrome": webdriver.ChromeOptions,
+            "Brave": webdriver.ChromeOptions,
+            "Firefox": webdriver.FirefoxOptions,
+            "Edge": webdriver.EdgeOptions
+        }
+        options = options_map[self.browser]()
+
+        # إعدادات مشتركة للمتصفحات
+        options.add_argument("--disable-blink-features=AutomationControlled")
+
+        # إعدادات خاصة بمتصفحات Chromium (Chrome, Brave, Edge)
+        if self.browser in ["Chrome", "Brave", "Edge"]:
+            options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            options.add_experimental_option("useAutomationExtension", False)
+            if self.browser == "Brave":
+                options.binary_location = self.browser_paths.get("brave")
+            if self.browser in ["Chrome", "Brave"]:
+                options.add_argument(f"user-data-dir={self.profile_dir}")
+            if self.headless:
+                options.add_argument("--headless=new")
+                options.add_argument(f"--user-agent={USER_AGENT}")
+
+        # إعدادات خاصة بـ Firefox
+        elif self.browser == "Firefox":
+            # إعدادات Firefox
+            firefox_profile = webdriver.FirefoxProfile()
+            firefox_profile.set_preference("dom.webdriver.enabled", False)
+            firefox_profile.set_preference("useAutomationExtension", False)
+            options.profile = firefox_profile
+            if self.headless:
+                options.add_argument("-headless")
+
+        return options
+
+    def _create_driver(self, driver_path, options):
+        service = Service(executable_path=driver_path)
+        driver_map = {
+            "Chrome": webdriver.Chrome,
+            "Brave": webdriver.Chrome,
+            "Firefox": webdriver.Firefox,
+            "Edge": webdriver.Edge
+        }
+        driver = driver_map[self.browser](service=service, options=options)
+        driver.set_window_size(1440, 900)  # Force window size
+        return driver
+
+    def _check_login_required(self):
+        # Races the QR code against the chat list, so a logged-in profile no
+        # longer waits out the whole QR timeout on every start.
+        state, element = self._wait_for("startup", STARTUP_STATES)
+        if state == "use_here":
+            # Another tab or window of this profile held the session
+            element.click()
+            state, _ = self._wait_for("startup", STARTUP_STATES[:2])
+        return state == "login"
+
+    def _process_number(self, number, message, attached_file, check_chat=False):
+        started = time.monotonic()
+        encoded_number = urllib.parse.quote(number, safe='')
+        self.step = "navigate"
+        self._retry_operation(
+            lambda: self.driver.get(f"{WHATSAPP_WEB_URL}/send?phone={encoded_number}")
+        )
+
+        self.step = "open_chat"
+        state = self._wait_for_chat_state()
+        if state == "continue":
+            # Handle "Use WhatsApp Web" popup
+            self.driver.find_element(By.XPATH, CONTINUE_BUTTON_XPATH).click()
+            state = self._wait_for_chat_state()
+        if state == "invalid":
+            raise NotOnWhatsAppError(f"{number} is not registered on WhatsApp")
+
+        self.step = "popups"
+        self._handle_popups()
+        self.step = "chat_load"
+        self._wait_for_chat_load()
+        
+        # Additional stability check
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+        if check_chat and self._message_in_chat(message):
+            self.log.info("Message already in chat with %s, not sending again", number,
+                          extra={"number": number, "step": "chat_load"})
+            return
+        self._compose_and_send(message, attached_file, started)
+
+    def _process_target(self, target, message, attached_file, check_chat=False):
+        started = time.monotonic()
+        self.step = "open_chat"
+        self._open_named_chat(target.name)
+        self.step = "popups"
+        self._handle_popups()
+        self.step = "chat_load"
+        self._wait_for_chat_load()
+
+        if check_chat and self._message_in_chat(message):
+            self.log.info("Message already in %s, not sending again", target,
+                          extra={"number": str(target), "step": "chat_load"})
+            return
+        self._compose_and_send(message, attached_file, started)
+
+    def _compose_and_send(self, message, attached_file, started):
+        self.step = "compose"
+        self._send_message(message)
+        self.step = "attach"
+        self._handle_attachments(attached_file)
+        self.step = "send"
+        self._send_with_retry()
+        self.step = "verify"
+        self._verify_delivery()
+        # Whole-contact latency without pacing, for the dry-run planner
+        self.timeouts.observe("contact", time.monotonic() - started)
+        self.step = "pacing"
+        time.sleep(random.uniform(*self.pacing))
+
+    def _open_named_chat(self, name):
+        """Opens an existing chat (broadcast list or group) through the chat search."""
+        search_box = self._ensure_element_ready(SEARCH_BOX_XPATH, "open_chat")
+        search_box.click()
+        search_box.send_keys(Keys.CONTROL, "a")
+        search_box.send_keys(Keys.BACKSPACE)
+        search_box.send_keys(name)
+        try:
+            match = self._wait_until("open_chat", search_result_xpath(name), VISIBLE)
+        except TimeoutException:
+            raise TargetNotFoundError(f"No chat named '{name}' in this WhatsApp account")
+        match.click()
+        # Never type into a chat that is not the one asked for
+        self._wait_until("open_chat", chat_header_xpath(name))
+
+    def _wait_for_chat_state(self):
+        """Races chat readiness against the invalid-number dialog, so an
+        unregistered number is reported as soon as the dialog renders."""
+        state, _ = self._wait_for("open_chat", CHAT_STATES)
+        return state
+
+    def _wait_for_chat_load(self):
+        self._wait_until("chat_load", CHAT_PANEL_XPATH)
+        self._wait_until("chat_load", MESSAGE_BOX_XPATH)
+
+    def _send_message(self, message):
+        message_box = self._ensure_element_ready(MESSAGE_BOX_XPATH)
+        self._safe_clear_input(message_box)
+        message_box.send_keys(message)
+
+    def _handle_attachments(self, attached_file):
+        if attached_file:
+            self._retry_operation(lambda: self._attach_file(attached_file))
+
+    def _attach_file(self, attached_file):
+        attachment_button = self._wait_until("attach", ATTACH_BUTTON_XPATH, VISIBLE)
+        attachment_button.click()
+        
+        file_input = self._wait_until("attach", FILE_INPUT_XPATH)
+        file_input.send_keys(attached_file)
+        
+        self._wait_until("attach", ATTACH_PREVIEW_XPATH)
+        # The preview is ready to send once its send button renders
+        self._wait_until("attach", SEND_BUTTON_XPATH, VISIBLE)
+
+    def _message_in_chat(self, message, recent=5):
+        return bool(self.driver.execute_script(MESSAGE_IN_CHAT_JS, message, recent))
+
+    def _send_with_retry(self):
+        """Clicks Send, clicking again only if the previous click did not land.
+
+        A click that went through clears the draft and removes the send
+        button, so its absence after a click means the message left even if
+        the click call itself reported an error.
+        """
+        clicked = False
+        for attempt in range(self.retry_count):
+            if clicked and not self.driver.find_elements(By.XPATH, SEND_BUTTON_XPATH):
+                return
+            try:
+                send_button = self._wait_until("send", SEND_BUTTON_XPATH, VISIBLE)
+                clicked = True
+                send_button.click()
+                return
+            except WebDriverException:
+                if attempt == self.retry_count - 1:
+                    raise
+                if clicked:
+                    # Give a click that did land the chance to remove the button
+                    self._wait_gone(SEND_BUTTON_XPATH, 1)
+
+    def _verify_delivery(self):
+        # The failure notice is raced against the delivery ticks instead of
+        # only being looked for after the whole verify timeout
+        try:
+            state, element = self._wait_for("verify", [["failed", SEND_FAILED_XPATH], ["delivered", DELIVERED_XPATH]])
+        except TimeoutException:
+            # Fallback verification
+            if not self.driver.find_elements(By.XPATH, MESSAGE_CONTAINER_XPATH):
+                raise DeliveryError("Message verification failed")
+            return
+        if state == "failed":
+            raise DeliveryError("Message failed to send: " + element.text)
+
+    def _update_progress(self, campaign, number, result):
+        if isinstance(number, FanoutTarget):
+            # Sent to the list or group, but not confirmed for any one member
+            status = STATUS_UNCONFIRMED if result["status"] == "Success" else result["status"]
+            results = [{"number": member, "status": status, "reason": result["reason"]}
+                       for member in number.members]
+            self.results.extend(results, campaign.name)
+            self.scheduler.record_all(campaign, number, results)
+            for member_result in results:
+                self._emit_progress(campaign, member_result["number"], member_result)
+            return
+        self.results.append(result, campaign.name)
+        self.scheduler.record(campaign, result)
+        self._emit_progress(campaign, number, result)
+
+    def _report_expired(self):
+        for campaign, result in self.scheduler.pop_expired():
+            self.log.info("Deadline passed, skipping %s", result["number"],
+                          extra={"campaign": campaign.name, "number": result["number"], "status": result["status"]})
+            self.results.append(result, campaign.name)
+            self._emit_progress(campaign, result["number"], result)
+
+    def _emit_progress(self, campaign, number, result):
+        processed, total = self.scheduler.processed, max(1, self.scheduler.total)
+        self.events.sent({
+            "sent": processed,
+            "total": self.scheduler.total,
+            "current": number,
+            "status": result["status"],
+            "reason": result["reason"],
+            "campaign": campaign.name
+        })
+        self.events.progress(int(processed / total * 100))
@@ -0,0 +1,200 @@
+"""Browser memory sampling and recycling for long campaigns.
+
+WhatsApp Web keeps every opened chat and its media in the page, so a tab
+that has sent thousands of messages holds a large JS heap and DOM and each
+contact gets slower. The sender samples the page at a regular interval
+(CDP Performance.getMetrics on Chromium browsers, process RSS through
+psutil when installed) and, at a contact boundary, reloads WhatsApp Web in
+a fresh tab or restarts the driver when a limit is crossed.
+"""
+import time
+import logging
+import statistics
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # optional: only needed for RSS limits
+    psutil = None
+
+RECYCLE_TAB = "tab"
+RECYCLE_DRIVER = "driver"
+
+MB = 1024 * 1024
+
+# CDP metric name -> sample key
+CDP_METRICS = {
+    "JSHeapUsedSize": "heap_used",
+    "JSHeapTotalSize": "heap_total",
+    "Nodes": "nodes",
+    "JSEventListeners": "listeners",
+    "Documents": "documents",
+}
+
+
+def sample_browser(driver, cdp_enabled):
+    """Returns a dict of whatever metrics this browser exposes (may be empty)."""
+    sample = {}
+    if cdp_enabled and hasattr(driver, "execute_cdp_cmd"):
+        try:
+            for metric in driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]:
+                key = CDP_METRICS.get(metric["name"])
+                if key:
+                    sample[key] = metric["value"]
+        except Exception:
+            # Metrics are best effort; a dead driver fails below Selenium
+            pass
+    if psutil is not None:
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is not None:
+            try:
+                # The driver's children are the browser and its renderers
+                children = psutil.Process(process.pid).children(recursive=True)
+                sample["rss"] = sum(child.memory_info().rss for child in children)
+            except psutil.Error:
+                pass
+    return sample
+
+
+class RecyclePolicy:
+    """Limits that trigger a recycle; None disables a limit.
+
+    Tab recycles (a fresh page) free the JS heap and DOM. The driver is
+    restarted instead when RSS stays over its limit after a tab recycle,
+    or after max_tab_recycles tab recycles in a row.
+    """
+
+    def __init__(self, max_contacts=400, max_heap_mb=768, max_nodes=150_000, max_rss_mb=3072,
+                 slowdown_factor=1.6, window=40, sample_interval=60, max_tab_recycles=5):
+        self.max_contacts = max_contacts
+        self.max_heap_mb = max_heap_mb
+        self.max_nodes = max_nodes
+        self.max_rss_mb = max_rss_mb
+        self.slowdown_factor = slowdown_factor
+        self.window = window
+        self.sample_interval = sample_interval
+        self.max_tab_recycles = max_tab_recycles
+
+    # setting -> (type, whether None disables it)
+    SETTINGS = {
+        "max_contacts": (int, True),
+        "max_heap_mb": (float, True),
+        "max_nodes": (int, True),
+        "max_rss_mb": (float, True),
+        "slowdown_factor": (float, True),
+        "window": (int, False),
+        "sample_interval": (float, False),
+        "max_tab_recycles": (int, False),
+    }
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Builds a policy from e.g. a campaign file's "recycle" object; raises
+        ValueError for an unknown setting or a value that is not a number."""
+        if not isinstance(spec, dict):
+            raise ValueError(f"Invalid recycle settings: {spec!r}")
+        values = {}
+        for key, value in spec.items():
+            if key not in cls.SETTINGS:
+                raise ValueError(f"Unknown recycle setting: {key}")
+            kind, optional = cls.SETTINGS[key]
+            if value is None and optional:
+                values[key] = None
+                continue
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                values[key] = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Recycle setting {key} must be a number, got {value!r}")
+            if values[key] < (1 if key == "window" else 0):
+                raise ValueError(f"Recycle setting {key} is out of range: {value!r}")
+        return cls(**values)
+
+
+class SessionRecycler:
+    """Tracks one browser session and decides when to recycle it."""
+
+    def __init__(self, policy=None, can_restart_driver=True):
+        self.policy = policy or RecyclePolicy()
+        self.can_restart_driver = can_restart_driver
+        self.last_sample = {}
+        self.tab_recycles = 0
+        self._cdp_enabled = None
+        self._rss_after_recycle = False
+        self.reset()
+
+    def reset(self, action=RECYCLE_DRIVER):
+        self.contacts = 0
+        self.baseline = None
+        self.durations = deque(maxlen=self.policy.window)
+        self._last_sampled = time.monotonic()
+        if action == RECYCLE_DRIVER:
+            self.tab_recycles = 0
+            self._cdp_enabled = None
+        else:
+            self.tab_recycles += 1
+
+    def contact_done(self, duration, succeeded):
+        self.contacts += 1
+        # Failed contacts mostly measure timeouts, not page speed
+        if succeeded:
+            self.durations.append(duration)
+            if self.baseline is None and len(self.durations) == self.durations.maxlen:
+                self.baseline = statistics.median(self.durations)
+
+    def check(self, driver):
+        """Returns (action, reason) when the session should be recycled now, else None."""
+        policy = self.policy
+        if self.contacts == 0:
+            return None
+        if time.monotonic() - self._last_sampled >= policy.sample_interval:
+            self._sample(driver)
+            reason = self._over_limit()
+            if reason:
+                return self._escalate(reason)
+        if policy.max_contacts and self.contacts >= policy.max_contacts:
+            return self._escalate(f"{self.contacts} contacts in this page")
+        if policy.slowdown_factor and self.baseline and len(self.durations) == self.durations.maxlen:
+            recent = statistics.median(self.durations)
+            if recent > self.baseline * policy.slowdown_factor:
+                return self._escalate(f"contacts slowed from {self.baseline:.1f}s to {recent:.1f}s")
+        return None
+
+    def _sample(self, driver):
+        self._last_sampled = time.monotonic()
+        if self._cdp_enabled is None:
+            self._cdp_enabled = False
+            if hasattr(driver, "execute_cdp_cmd"):
+                try:
+                    driver.execute_cdp_cmd("Performance.enable", {})
+                    self._cdp_enabled = True
+                except Exception:
+                    pass
+        self.last_sample = sample_browser(driver, self._cdp_enabled)
+        if self.durations:
+            self.last_sample["contact_seconds"] = round(statistics.median(self.durations), 2)
+        logging.info("Browser metrics after %s contacts: %s", self.contacts, ", ".join(
+            f"{key}={value / MB:.0f}MB" if key in ("heap_used", "heap_total", "rss") else f"{key}={value:g}"
+            for key, value in sorted(self.last_sample.items())
+        ))
+
+    def _over_limit(self):
+        policy = self.policy
+        sample = self.last_sample
+        if policy.max_rss_mb and sample.get("rss", 0) > policy.max_rss_mb * MB:
+            self._rss_after_recycle = True
+            return f"browser RSS {sample['rss'] / MB:.0f}MB over {policy.max_rss_mb}MB"
+        if policy.max_heap_mb and sample.get("heap_used", 0) > policy.max_heap_mb * MB:
+            return f"JS heap {sample['heap_used'] / MB:.0f}MB over {policy.max_heap_mb}MB"
+        if policy.max_nodes and sample.get("nodes", 0) > policy.max_nodes:
+            return f"{sample['nodes']:.0f} DOM nodes over {policy.max_nodes}"
+        return None
+
+    def _escalate(self, reason):
+        restart = self.can_restart_driver and (
+            (self._rss_after_recycle and self.tab_recycles > 0)
+            or self.tab_recycles >= self.policy.max_tab_recycles
+        )
+        self._rss_after_recycle = False
+        return (RECYCLE_DRIVER if restart else RECYCLE_TAB), reason
@@ -0,0 +1,154 @@
+"""Session health checks, circuit breaker and stall watchdog for the sender.
+
+The send loop probes the WhatsApp Web session at every contact boundary and
+after every failed contact. When the session is unhealthy the circuit
+breaker opens: the queue pauses instead of failing the remaining contacts
+one by one, and the sender recovers (waits out a connectivity banner,
+reloads, or recreates the driver from the persistent profile) before
+resuming at the same contact.
+
+SessionWatchdog runs beside the loop and handles what a probe cannot: a
+driver call that never returns. It never issues WebDriver commands itself,
+it only force-closes a driver that has been stuck on one contact too long,
+which makes the blocked call fail and hands control back to the loop.
+"""
+import time
+import logging
+import threading
+
+HEALTHY = "healthy"
+DEAD = "dead"                  # browser crashed or WebDriver session is gone
+DISCONNECTED = "disconnected"  # "Phone not connected" style banners
+LOGGED_OUT = "logged_out"      # QR code shown again
+
+# One round trip: QR code first, then any known connectivity banner. Only
+# alert elements are read: the banner strings can also appear in message
+# bubbles (#main) and chat-list previews (#pane-side), which are skipped.
+HEALTH_JS = """
+if (document.querySelector('[data-testid="qrcode"], canvas[aria-label*="QR"]')) { return "logged_out"; }
+var banners = arguments[0];
+var alerts = document.querySelectorAll(arguments[1]);
+for (var i = 0; i < alerts.length; i++) {
+    var alert = alerts[i];
+    if (alert.closest("#main, #pane-side")) { continue; }
+    // An alert icon's text sits next to it, not inside it
+    var box = alert.hasAttribute("data-icon") && alert.parentElement && alert.parentElement.parentElement || alert;
+    var text = box.innerText || "";
+    for (var j = 0; j < banners.length; j++) {
+        if (text.indexOf(banners[j]) !== -1) { return "disconnected"; }
+    }
+}
+return "healthy";
+"""
+BANNER_SELECTOR = '[role="alert"], [data-testid*="alert"], [data-icon^="alert-"]'
+DISCONNECTED_BANNERS = [
+    "Phone not connected",
+    "Computer not connected",
+    "Trying to reach phone",
+    "Make sure your phone has an active internet connection",
+]
+
+
+class SessionUnrecoverable(Exception):
+    pass
+
+
+class LoginRequired(SessionUnrecoverable):
+    pass
+
+
+def probe_session(driver):
+    if driver is None:
+        return DEAD
+    try:
+        return driver.execute_script(HEALTH_JS, DISCONNECTED_BANNERS, BANNER_SELECTOR) or HEALTHY
+    except Exception:
+        # Once the driver service is gone (e.g. after force_close) calls fail
+        # with urllib3 connection errors rather than WebDriverException
+        return DEAD
+
+
+def force_close(driver, timeout=10):
+    """Quits a driver from another thread, killing the service if quit hangs."""
+    closer = threading.Thread(target=_quietly_quit, args=(driver,), daemon=True)
+    closer.start()
+    closer.join(timeout)
+    if closer.is_alive():
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is not None:
+            process.kill()
+
+
+def _quietly_quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+# ------------------- Circuit Breaker -------------------
+class CircuitBreaker:
+    """Counts recovery attempts while open and spaces them with backoff."""
+
+    def __init__(self, max_attempts=5, base_delay=5, max_delay=300):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reason = None
+        self.attempts = 0
+
+    @property
+    def is_open(self):
+        return self.reason is not None
+
+    def open(self, reason):
+        if self.reason is None:
+            self.reason = reason
+
+    def next_delay(self):
+        """Returns how long to wait before the next recovery attempt."""
+        if self.attempts >= self.max_attempts:
+            raise SessionUnrecoverable(
+                f"Session still {self.reason} after {self.attempts} recovery attempts"
+            )
+        delay = 0 if self.attempts == 0 else min(self.max_delay, self.base_delay * 2 ** (self.attempts - 1))
+        self.attempts += 1
+        return delay
+
+    def close(self):
+        self.reason = None
+
+    def record_success(self):
+        # Only a delivered message proves the session works again
+        self.attempts = 0
+
+
+# ------------------- Stall Watchdog -------------------
+class SessionWatchdog(threading.Thread):
+    def __init__(self, get_driver, stall_timeout=300, interval=5):
+        super().__init__(daemon=True)
+        self.get_driver = get_driver
+        self.stall_timeout = stall_timeout
+        self.interval = interval
+        self._contact_started = None
+        self._stop_event = threading.Event()
+
+    def contact_started(self):
+        self._contact_started = time.monotonic()
+
+    def contact_finished(self):
+        self._contact_started = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            started = self._contact_started
+            driver = self.get_driver()
+            if driver is None:
+                continue
+            if started is not None and time.monotonic() - started > self.stall_timeout:
+                logging.error(f"Contact stalled for over {self.stall_timeout}s, closing the browser")
+                self._contact_started = None
+                force_close(driver)
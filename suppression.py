@@ -0,0 +1,318 @@
+"""Persistent index of numbers that must not be messaged again.
+
+Numbers are keyed on their E.164 digits stored as SQLite INTEGER PRIMARY
+KEYs. A Bloom filter saved next to the database answers most lookups for
+numbers that were never contacted without touching SQLite; only the Bloom
+hits are confirmed against the table, in one bulk join. Processes sharing
+the database add each other's new rows to their filter incrementally.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+import phonenumbers
+
+REASON_SENT = "sent"
+REASON_OPT_OUT = "opt_out"
+REASON_NOT_REGISTERED = "not_registered"
+
+# Numbers can join WhatsApp later, so "not registered" entries expire
+NOT_REGISTERED_TTL = 30 * 24 * 3600
+
+# Rows written by other processes are picked up by updated_at; the overlap
+# covers writers whose timestamp was taken before a slow commit.
+SYNC_OVERLAP = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppressed (
+    number INTEGER PRIMARY KEY,
+    reason TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS suppressed_updated_at ON suppressed (updated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_SEPARATORS = str.maketrans("", "", " \t-().")
+
+FilterResult = namedtuple("FilterResult", "kept suppressed duplicates invalid")
+
+
+def normalize_number(number, default_region=None):
+    """Returns the E.164 digits of a number as an int, or None if it is invalid.
+
+    Numbers already written in international form skip phonenumbers parsing,
+    which is by far the slowest part of filtering a large list.
+    """
+    compact = number.translate(_SEPARATORS)
+    if compact.startswith("00"):
+        compact = "+" + compact[2:]
+    if compact.startswith("+") and compact[1:].isdigit() and 8 <= len(compact) <= 16:
+        return int(compact[1:])
+    try:
+        parsed = phonenumbers.parse(number, default_region)
+    except phonenumbers.phonenumberutil.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(parsed):
+        return None
+    return int(f"{parsed.country_code}{parsed.national_number}")
+
+
+def validate_numbers(numbers):
+    """Raises ValueError for the first number that is not a valid
+    international number; a campaign with one is rejected as a whole."""
+    for number in numbers:
+        try:
+            parsed_number = phonenumbers.parse(number, None)
+            if not phonenumbers.is_valid_number(parsed_number):
+                raise ValueError(f"Invalid phone number: {number}")
+        except phonenumbers.phonenumberutil.NumberParseException:
+            raise ValueError(f"Invalid phone number format: {number}")
+
+
+# ------------------- Bloom Filter -------------------
+class BloomFilter:
+    """Bit array with k probe positions derived from two multiplicative hashes."""
+
+    HEADER_SIZE = 24
+
+    def __init__(self, capacity, bits_per_entry=16, hash_count=5):
+        self.size = max(8 * 1024, capacity * bits_per_entry)
+        self.hash_count = hash_count
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+
+    @staticmethod
+    def _hashes(key):
+        h1 = (key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        h2 = (((key ^ (key >> 29)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF) | 1
+        return h1, h2
+
+    def add(self, key):
+        h1, h2 = self._hashes(key)
+        bits = self.bits
+        size = self.size
+        for _ in range(self.hash_count):
+            position = h1 % size
+            bits[position >> 3] |= 1 << (position & 7)
+            h1 += h2
+
+    def __contains__(self, key):
+        # Inlined with an early exit: most misses stop at the first probe
+        h1, h2 = self._hashes(key)
+        bits = self.bits
+        size = self.size
+        for _ in range(self.hash_count):
+            position = h1 % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            h1 += h2
+        return True
+
+    def save(self, path, generation):
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.size.to_bytes(8, "little"))
+            f.write(self.hash_count.to_bytes(8, "little"))
+            f.write(generation.to_bytes(8, "little"))
+            f.write(self.bits)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (filter, generation) or (None, None) if the file is missing or damaged."""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(cls.HEADER_SIZE)
+                bits = bytearray(f.read())
+        except OSError:
+            return None, None
+        if len(header) != cls.HEADER_SIZE:
+            return None, None
+        size = int.from_bytes(header[0:8], "little")
+        if len(bits) != (size + 7) // 8:
+            return None, None
+        bloom = cls.__new__(cls)
+        bloom.size = size
+        bloom.hash_count = int.from_bytes(header[8:16], "little")
+        bloom.capacity = size // 16
+        bloom.bits = bits
+        return bloom, int.from_bytes(header[16:24], "little")
+
+
+# ------------------- Suppression Index -------------------
+class SuppressionIndex:
+    def __init__(self, path, expected_entries=1_000_000, default_region=None,
+                 not_registered_ttl=NOT_REGISTERED_TTL):
+        self.path = path
+        self.not_registered_ttl = not_registered_ttl
+        self.bloom_path = path + ".bloom"
+        self.expected_entries = expected_entries
+        self.default_region = default_region
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._dirty = False
+        self.bloom = self._load_bloom()
+
+    def _generation(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _bump_generation(self):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def _refresh_bloom(self):
+        """Adds rows written since the last sync (by any process) to the filter.
+
+        Only additions matter: removed numbers keep their bits, which costs
+        a table lookup but never a wrong answer. The whole filter is only
+        rebuilt when the table outgrows it.
+        """
+        generation = self._generation()
+        if generation == self._known_generation:
+            return
+        synced_at = time.time()
+        rows = self.conn.execute(
+            "SELECT number FROM suppressed WHERE updated_at >= ?", (self._synced_at - SYNC_OVERLAP,)
+        )
+        for (number,) in rows:
+            self.bloom.add(number)
+            # Upper bound (overlapping rows are counted again); COUNT(*) scans the table
+            self._entries += 1
+        self._known_generation = generation
+        self._synced_at = synced_at
+        self._dirty = True
+        if self._entries > self.bloom.capacity:
+            self._entries = self.conn.execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
+            if self._entries > self.bloom.capacity:
+                self.bloom = self._load_bloom()
+
+    def _load_bloom(self):
+        # The generation counter changes on every write, so a filter saved by
+        # another process (or before a crash) is never trusted when stale.
+        bloom, generation = BloomFilter.load(self.bloom_path)
+        count = self.conn.execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
+        self._known_generation = self._generation()
+        self._synced_at = time.time()
+        self._entries = count
+        if bloom is not None and generation == self._known_generation and count <= bloom.capacity:
+            return bloom
+        return self._rebuild_bloom(count)
+
+    def _rebuild_bloom(self, count):
+        started = time.monotonic()
+        bloom = BloomFilter(max(self.expected_entries, count * 2))
+        for (number,) in self.conn.execute("SELECT number FROM suppressed"):
+            bloom.add(number)
+        bloom.save(self.bloom_path, self._generation())
+        logging.info(f"Rebuilt suppression filter for {count} numbers in {time.monotonic() - started:.1f}s")
+        return bloom
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM suppressed").fetchone()[0]
+
+    def filter(self, numbers, ignore_reasons=()):
+        """Splits a campaign list in one pass.
+
+        Returns FilterResult(kept, suppressed, duplicates, invalid) where
+        kept keeps the caller's spelling and order, suppressed is a list of
+        (number, reason) and duplicates are repeats within the list itself.
+        Entries with a reason in ignore_reasons do not suppress a number
+        (e.g. REASON_SENT for transactional messages).
+        """
+        with self._lock:
+            self._refresh_bloom()
+        seen = set()
+        candidates = []
+        duplicates = []
+        invalid = []
+        bloom = self.bloom
+        for number in numbers:
+            key = normalize_number(number, self.default_region)
+            if key is None:
+                invalid.append(number)
+            elif key in seen:
+                duplicates.append(number)
+            else:
+                seen.add(key)
+                candidates.append((number, key, key in bloom))
+
+        hits = {}
+        maybe = [(key,) for _, key, in_bloom in candidates if in_bloom]
+        if maybe:
+            with self._lock:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (number INTEGER PRIMARY KEY)")
+                self.conn.execute("DELETE FROM lookup")
+                self.conn.executemany("INSERT INTO lookup (number) VALUES (?)", maybe)
+                hits = dict(self.conn.execute(
+                    # CROSS JOIN keeps the small lookup table as the outer loop
+                    "SELECT s.number, s.reason FROM lookup l CROSS JOIN suppressed s ON s.number = l.number "
+                    "WHERE (s.reason != ? OR s.updated_at >= ?) "
+                    f"AND s.reason NOT IN ({', '.join('?' * len(ignore_reasons))})",
+                    (REASON_NOT_REGISTERED, time.time() - self.not_registered_ttl, *ignore_reasons)
+                ))
+                self.conn.execute("DELETE FROM lookup")
+                self.conn.commit()
+
+        kept = []
+        suppressed = []
+        for number, key, _ in candidates:
+            reason = hits.get(key)
+            if reason is None:
+                kept.append(number)
+            else:
+                suppressed.append((number, reason))
+        return FilterResult(kept, suppressed, duplicates, invalid)
+
+    def add(self, numbers, reason):
+        """Records numbers; an opt-out is never downgraded by a later send."""
+        now = time.time()
+        keys = [key for key in (normalize_number(n, self.default_region) for n in numbers) if key is not None]
+        if not keys:
+            return 0
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO suppressed (number, reason, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(number) DO UPDATE SET reason = excluded.reason, updated_at = excluded.updated_at "
+                f"WHERE suppressed.reason != '{REASON_OPT_OUT}' OR excluded.reason = '{REASON_OPT_OUT}'",
+                ((key, reason, now) for key in keys)
+            )
+            self._bump_generation()
+            self.conn.commit()
+            for key in keys:
+                self.bloom.add(key)
+            self._dirty = True
+        return len(keys)
+
+    def remove(self, numbers):
+        """Forgets numbers (e.g. a contact opted back in). The Bloom filter keeps
+        their bits, which only costs a table lookup."""
+        keys = [(key,) for key in (normalize_number(n, self.default_region) for n in numbers) if key is not None]
+        with self._lock:
+            self.conn.executemany("DELETE FROM suppressed WHERE number = ?", keys)
+            self._bump_generation()
+            self.conn.commit()
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                # Only claim the generation whose rows are all in the filter
+                self._refresh_bloom()
+                self.bloom.save(self.bloom_path, self._known_generation)
+                self._dirty = False
+
+    def close(self):
+        self.flush()
+        self.conn.close()
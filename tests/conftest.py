@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class DeadDriver:
+    """A driver whose service was stopped (e.g. by force_close): every call
+    fails below Selenium with a urllib3 connection error."""
+
+    def __getattr__(self, name):
+        from urllib3.exceptions import MaxRetryError
+        raise MaxRetryError(None, "/session/dead", ConnectionRefusedError(111, "Connection refused"))
+
+
+@pytest.fixture
+def dead_driver():
+    return DeadDriver()
@@ -0,0 +1,32 @@
+import pytest
+from broadcast import FanoutTarget, plan_fanout, validate_targets, xpath_literal
+
+
+def test_target_used_only_when_every_member_is_due():
+    whole = FanoutTarget("broadcast", "Whole", ["1", "2"])
+    partial = FanoutTarget("group", "Partial", ["3", "9"])
+    plan = plan_fanout(["1", "3", "2", "4"], [whole, partial])
+    assert plan.items == [whole, "3", "4"]
+    assert plan.targets == [whole]
+    assert plan.fallbacks == [partial]
+
+
+def test_invalid_targets():
+    with pytest.raises(ValueError):
+        FanoutTarget("channel", "News", ["1"])
+    with pytest.raises(ValueError):
+        FanoutTarget("broadcast", "Empty", [])
+    with pytest.raises(ValueError):
+        FanoutTarget("broadcast", "Huge", [str(n) for n in range(257)])
+    with pytest.raises(ValueError):
+        validate_targets([FanoutTarget("broadcast", "A", ["1"]), FanoutTarget("group", "B", ["1"])])
+    with pytest.raises(ValueError):
+        FanoutTarget.from_dict({"name": "No members"})
+    with pytest.raises(ValueError):
+        FanoutTarget.from_dict({"name": "Team", "members": "+14155550101"})
+
+
+def test_xpath_literal_quotes():
+    assert xpath_literal("Team") == '"Team"'
+    assert xpath_literal('Say "hi"') == "'Say \"hi\"'"
+    assert xpath_literal("""It's "on\"""") == """concat("It's ", '"', "on", '"', "")"""
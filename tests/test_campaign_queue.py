@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from campaign_queue import CampaignQueue, QueueWorker, STATUS_PENDING
+from sender_core import CampaignSender
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = CampaignQueue(str(tmp_path / "queue.db"))
+    yield queue
+    queue.close()
+
+
+def test_lease_skips_excluded_campaigns(queue):
+    first = queue.add_campaign(["+14155550101"], "Hi")
+    second = queue.add_campaign(["+14155550102"], "Hi")
+    assert queue.lease("w1", exclude_campaigns=[first])["campaign"]["id"] == second
+    assert queue.lease("w1", exclude_campaigns=[first]) is None
+
+
+def test_worker_without_the_attachment_leaves_the_campaign(queue, tmp_path):
+    with_file = queue.add_campaign(["+14155550101", "+14155550102"], "Hi", attached_file="/missing/brochure.pdf")
+    plain = queue.add_campaign(["+14155550103"], "Hi")
+    # No browser is needed: the attachment is checked before the first contact
+    worker = QueueWorker(queue, "host-a:1", CampaignSender([], "", None, "Chrome", 0, str(tmp_path)))
+
+    lease = queue.lease(worker.worker_id, exclude_campaigns=worker.skipped_campaigns)
+    worker._process_lease(lease)
+    assert worker.skipped_campaigns == {with_file}
+    assert queue.campaign_status(with_file) == {STATUS_PENDING: 2, "total": 2}
+    assert queue.lease(worker.worker_id, exclude_campaigns=worker.skipped_campaigns)["campaign"]["id"] == plain
+    # Another host picks the campaign up
+    assert queue.lease("host-b:1")["campaign"]["id"] == with_file
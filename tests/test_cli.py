@@ -0,0 +1,47 @@
+import json
+import pytest
+
+pytest.importorskip("selenium")
+
+from cli import load_campaign, main, CampaignError, EXIT_USAGE
+
+
+def write_campaign(tmp_path, **fields):
+    data = {"numbers": ["+14155550101"], "message": "Hello"}
+    data.update(fields)
+    path = tmp_path / "campaign.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_load_campaign(tmp_path):
+    campaign = load_campaign(write_campaign(tmp_path, pacing={"min": 1, "max": "3"}, profile_dir="profile"))
+    assert campaign["numbers"] == ["+14155550101"]
+    assert campaign["pacing"] == (1.0, 3.0)
+    assert campaign["profile_dir"] == str(tmp_path / "profile")
+
+
+@pytest.mark.parametrize("fields", [
+    {"pacing": {"min": "x"}},
+    {"pacing": [2, 5]},
+    {"retry": {"delay": "2m"}},
+    {"retry": {"max_attempts": None}},
+    {"retry": 3},
+    {"delay": "fast"},
+    {"delay": True},
+    {"numbers": "+14155550101"},
+    {"message": ["Hello"]},
+    {"numbers_file": 7},
+    {"attachments": [{"path": "a.png"}]},
+    {"windows": {"start": "09:00", "end": "17:00"}},
+    {"profile_dir": ["profile"]},
+    {"recycle": {"max_contacts": "many"}},
+    {"recycle": "off"},
+])
+def test_invalid_values_are_campaign_errors(tmp_path, fields):
+    with pytest.raises(CampaignError):
+        load_campaign(write_campaign(tmp_path, **fields))
+
+
+def test_invalid_file_exits_with_usage_error(tmp_path):
+    assert main([write_campaign(tmp_path, pacing={"min": "x"})]) == EXIT_USAGE
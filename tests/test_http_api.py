@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from http_api import EnqueueService
+from sender_core import CampaignSender
+from send_queue import SendScheduler
+
+
+@pytest.fixture
+def service(tmp_path):
+    sender = CampaignSender([], "", None, "Chrome", 0, str(tmp_path), scheduler=SendScheduler())
+    return EnqueueService(sender, upload_dir=str(tmp_path / "uploads"))
+
+
+def test_bad_items_are_rejected_one_by_one(service):
+    response = service.submit_messages([
+        {"number": "+14155550101", "message": "Hi", "campaign": ["x"]},
+        {"number": "+14155550102", "message": "Hi", "attachment": 5},
+        {"number": "+14155550103", "message": "Hi", "campaign": "orders"},
+    ])
+    assert [entry["index"] for entry in response["rejected"]] == [0, 1]
+    assert [entry["index"] for entry in response["accepted"]] == [2]
+    campaign = service._campaigns[response["accepted"][0]["campaign_id"]]
+    assert campaign.name == "orders"
+
+
+@pytest.mark.parametrize("spec", [
+    {"numbers": ["+14155550101"], "message": "Hi", "name": ["x"]},
+    {"message": "Hi", "fanout": [{"type": "group", "name": "Team", "members": "+14155550101"}]},
+])
+def test_invalid_campaigns_are_rejected(service, spec):
+    with pytest.raises(ValueError):
+        service.submit_campaign(spec)
+    assert service.sender.scheduler.total == 0
+
+
+def test_campaign_is_queued(service):
+    response = service.submit_campaign({"numbers": ["+14155550101"], "message": "Hi", "name": "news"})
+    assert len(response["ids"]) == 1
+    assert service.campaign_status(response["campaign_id"])["name"] == "news"
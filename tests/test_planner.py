@@ -0,0 +1,57 @@
+import datetime
+import pytest
+
+pytest.importorskip("phonenumbers")
+
+from planner import finish_time, prepare_send, RateEstimator, format_duration
+from broadcast import FanoutTarget
+from send_queue import SendWindow
+
+
+def local(year, month, day, hour=0, minute=0):
+    return datetime.datetime(year, month, day, hour, minute).timestamp()
+
+
+def test_finish_time_without_windows():
+    assert finish_time(1000.0, 60) == 1060.0
+
+
+def test_finish_time_skips_closed_hours_and_weekends():
+    window = SendWindow("09:00", "17:00", "mon-fri")
+    # Two hours left on Friday afternoon, the rest from Monday morning
+    start = local(2024, 5, 10, 15, 0)
+    assert finish_time(start, 3 * 3600, [window]) == local(2024, 5, 13, 10, 0)
+    # Starting before the window opens
+    assert finish_time(local(2024, 5, 6, 7, 0), 1800, [window]) == local(2024, 5, 6, 9, 30)
+
+
+def test_finish_time_across_an_overnight_window():
+    window = SendWindow("22:00", "02:00")
+    assert finish_time(local(2024, 5, 6, 23, 0), 4 * 3600, [window]) == local(2024, 5, 7, 23, 0)
+
+
+def test_prepare_send_without_suppression():
+    target = FanoutTarget("broadcast", "List", ["+14155550101", "+14155550102"])
+    selected, plan = prepare_send(["+14155550101", "+14155550102", "+14155550103"], targets=[target])
+    assert selected.kept == ["+14155550101", "+14155550102", "+14155550103"]
+    assert plan.items == [target, "+14155550103"]
+    with pytest.raises(ValueError):
+        prepare_send(["12"])
+
+
+def test_rate_estimator_smooths_observations():
+    estimator = RateEstimator(alpha=0.5)
+    estimator.update(0, now=0)
+    assert estimator.eta_seconds(10) is None
+    estimator.update(2, now=20)
+    assert estimator.seconds_per_contact == 10
+    estimator.update(3, now=50)
+    assert estimator.seconds_per_contact == 20
+    assert estimator.per_minute == 3
+    assert estimator.eta_seconds(5) == 100
+
+
+def test_format_duration():
+    assert format_duration(59) == "59s"
+    assert format_duration(60) == "1m 00s"
+    assert format_duration(3 * 3600 + 60) == "3h 01m"
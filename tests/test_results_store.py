@@ -0,0 +1,15 @@
+from results_store import ResultStore
+
+
+def test_counts_and_status_filter():
+    store = ResultStore()
+    store.append({"number": "1", "status": "Success", "reason": ""})
+    store.append({"number": "2", "status": "Failed", "reason": "Timed out\nStacktrace: ..."})
+    store.append({"number": "3", "status": "Rate limited", "reason": ""}, campaign=7)
+    assert len(store) == 3
+    assert store.counts() == {"Success": 1, "Failed": 1, "Rate limited": 1}
+    assert store.numbers_with_status("Failed") == ["2"]
+    assert store.numbers_with_status("Expired") == []
+    assert store[1]["reason"] == "Timed out"
+    assert store[2]["campaign"] == 7
+    assert [row["number"] for row in store] == ["1", "2", "3"]
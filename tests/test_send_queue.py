@@ -0,0 +1,238 @@
+import time
+import datetime
+import pytest
+from broadcast import FanoutTarget
+from send_queue import (
+    Campaign, SendScheduler, SendWindow, RetryPolicy, STATUS_EXPIRED, CAMPAIGN_DONE,
+    PRIORITY_URGENT, PRIORITY_BULK, parse_priority
+)
+
+
+def local(year, month, day, hour=0, minute=0):
+    return datetime.datetime(year, month, day, hour, minute).timestamp()
+
+
+# 2024-05-06 is a Monday
+MONDAY = (2024, 5, 6)
+
+
+def take(scheduler):
+    item = scheduler.next(timeout=0)
+    assert item is not None
+    return item
+
+
+def succeed(scheduler, campaign, number):
+    scheduler.record(campaign, {"number": number, "status": "Success", "reason": ""})
+
+
+# ------------------- Scheduler -------------------
+def test_higher_priority_preempts_at_next_contact():
+    scheduler = SendScheduler()
+    bulk = Campaign(["1", "2", "3"], "bulk", priority=PRIORITY_BULK)
+    scheduler.add(bulk)
+    campaign, number = take(scheduler)
+    assert (campaign, number) == (bulk, "1")
+
+    urgent = Campaign(["9"], "urgent", priority=PRIORITY_URGENT)
+    scheduler.add(urgent)
+    succeed(scheduler, campaign, number)
+    assert take(scheduler) == (urgent, "9")
+    assert take(scheduler) == (bulk, "2")
+
+
+def test_same_priority_campaigns_take_turns():
+    scheduler = SendScheduler()
+    first = Campaign(["a1", "a2"], "a")
+    second = Campaign(["b1", "b2"], "b")
+    scheduler.add(first)
+    scheduler.add(second)
+    order = []
+    for _ in range(4):
+        campaign, number = take(scheduler)
+        order.append(number)
+        succeed(scheduler, campaign, number)
+    assert order == ["a1", "b1", "a2", "b2"]
+
+
+def test_close_when_idle_finishes_after_last_result():
+    scheduler = SendScheduler(close_when_idle=True)
+    campaign = Campaign(["1"], "m")
+    scheduler.add(campaign)
+    _, number = take(scheduler)
+    assert not scheduler.finished()
+    succeed(scheduler, campaign, number)
+    assert scheduler.next(timeout=0) is None
+    assert scheduler.finished()
+    assert campaign.state == CAMPAIGN_DONE
+    assert not scheduler.add(Campaign(["2"], "late"))
+
+
+def test_start_at_holds_campaign_back():
+    scheduler = SendScheduler(close_when_idle=True)
+    scheduler.add(Campaign(["1"], "later", start_at=time.time() + 3600))
+    assert scheduler.next(timeout=0) is None
+    assert not scheduler.finished()
+
+
+def test_deadline_expires_pending_contacts():
+    scheduler = SendScheduler(close_when_idle=True)
+    campaign = Campaign(["1", "2"], "m", deadline=time.time() - 1)
+    scheduler.add(campaign)
+    assert scheduler.next(timeout=0) is None
+
+    expired = scheduler.pop_expired()
+    assert [result["number"] for _, result in expired] == ["1", "2"]
+    assert all(result["status"] == STATUS_EXPIRED for _, result in expired)
+    assert campaign.counts == {STATUS_EXPIRED: 2}
+    assert scheduler.processed == scheduler.total == 2
+    assert scheduler.finished()
+
+
+def test_expiry_keeps_the_failure_of_contacts_waiting_for_a_retry():
+    scheduler = SendScheduler(retry_policy=RetryPolicy(base_delay=3600))
+    campaign = Campaign(["1"], "m", deadline=time.time() + 3600)
+    scheduler.add(campaign)
+    _, number = take(scheduler)
+    failed = {"number": number, "status": "Failed", "reason": "timeout"}
+    assert scheduler.retry_later(campaign, number, failed) == 3600
+
+    campaign.deadline = time.time() - 1
+    assert scheduler.next(timeout=0) is None
+    assert [result for _, result in scheduler.pop_expired()] == [failed]
+
+
+def test_retry_passes_until_out_of_attempts():
+    scheduler = SendScheduler(retry_policy=RetryPolicy(max_attempts=3, base_delay=0))
+    campaign = Campaign(["1", "2"], "m")
+    scheduler.add(campaign)
+    failed = {"number": "1", "status": "Failed", "reason": "timeout"}
+
+    _, number = take(scheduler)
+    assert scheduler.retry_later(campaign, number, failed) == 0
+    # The retry joins the back of the campaign, after its first pass
+    assert take(scheduler) == (campaign, "2")
+    succeed(scheduler, campaign, "2")
+    assert take(scheduler) == (campaign, "1")
+    assert scheduler.retry_later(campaign, "1", failed, may_have_sent=True) == 0
+    assert "1" in campaign.check_chat
+    assert take(scheduler) == (campaign, "1")
+    # Third attempt: no more passes, the caller records the failure
+    assert scheduler.retry_later(campaign, "1", failed) is None
+    scheduler.record(campaign, failed)
+    assert "1" not in campaign.check_chat
+    assert campaign.counts == {"Success": 1, "Failed": 1}
+
+
+def test_retry_policy_backoff():
+    policy = RetryPolicy(max_attempts=4, base_delay=120, factor=4, max_delay=1000)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [120, 480, 1000, None]
+
+
+def test_requeue_puts_contact_back_at_the_head():
+    scheduler = SendScheduler()
+    campaign = Campaign(["1", "2"], "m")
+    scheduler.add(campaign)
+    _, number = take(scheduler)
+    scheduler.requeue(campaign, number, may_have_sent=True)
+    assert take(scheduler) == (campaign, "1")
+    assert "1" in campaign.check_chat
+
+
+def test_cancel_drops_pending_contacts():
+    scheduler = SendScheduler(close_when_idle=True)
+    campaign = Campaign(["1", "2", "3"], "m")
+    scheduler.add(campaign)
+    assert scheduler.cancel(campaign.id)
+    assert scheduler.total == 0
+    assert scheduler.next(timeout=0) is None
+    assert not scheduler.cancel(12345)
+
+
+def test_fanout_targets_count_per_member():
+    scheduler = SendScheduler(close_when_idle=True)
+    target = FanoutTarget("broadcast", "List", ["1", "2", "3"])
+    campaign = Campaign(["9"], "m", targets=[target])
+    assert campaign.numbers == ["9", "1", "2", "3"]
+    scheduler.add(campaign, [target, "9"])
+    assert scheduler.total == 4
+
+    _, item = take(scheduler)
+    assert item is target
+    scheduler.expand(campaign, target)
+    assert [take(scheduler)[1] for _ in range(4)] == ["1", "2", "3", "9"]
+
+
+def test_fanout_target_expires_per_member():
+    scheduler = SendScheduler()
+    target = FanoutTarget("group", "Team", ["1", "2"])
+    campaign = Campaign([], "m", targets=[target], deadline=time.time() - 1)
+    scheduler.add(campaign, [target])
+    scheduler.next(timeout=0)
+    assert sorted(result["number"] for _, result in scheduler.pop_expired()) == ["1", "2"]
+    assert scheduler.processed == 2
+
+
+def test_parse_priority():
+    assert parse_priority("urgent") == PRIORITY_URGENT
+    assert parse_priority(PRIORITY_BULK) == PRIORITY_BULK
+    with pytest.raises(ValueError):
+        parse_priority("soon")
+    with pytest.raises(ValueError):
+        parse_priority(9)
+
+
+# ------------------- Send Windows -------------------
+def test_overnight_window():
+    window = SendWindow("22:00", "06:00")
+    assert window.contains(local(*MONDAY, 23, 0))
+    assert window.contains(local(2024, 5, 7, 5, 59))
+    assert not window.contains(local(*MONDAY, 12, 0))
+    assert window.next_close(local(*MONDAY, 23, 0)) == local(2024, 5, 7, 6, 0)
+    assert window.next_close(local(2024, 5, 7, 1, 0)) == local(2024, 5, 7, 6, 0)
+
+
+def test_overnight_window_belongs_to_the_day_it_starts():
+    # Open Friday night into Saturday morning, not Sunday night
+    window = SendWindow("22:00", "06:00", "fri")
+    assert window.contains(local(2024, 5, 10, 23, 0))
+    assert window.contains(local(2024, 5, 11, 5, 0))
+    assert not window.contains(local(2024, 5, 12, 23, 0))
+    assert not window.contains(local(2024, 5, 10, 5, 0))
+
+
+def test_weekday_window():
+    window = SendWindow("09:00", "17:00", "mon-fri")
+    assert window.contains(local(2024, 5, 10, 10, 0))
+    assert not window.contains(local(2024, 5, 11, 10, 0))
+    # From Saturday the next opening is Monday morning
+    assert window.next_open(local(2024, 5, 11, 10, 0)) == local(2024, 5, 13, 9, 0)
+    # Already open: now
+    assert window.next_open(local(*MONDAY, 10, 0)) == local(*MONDAY, 10, 0)
+    assert window.next_open(local(*MONDAY, 17, 0)) == local(2024, 5, 7, 9, 0)
+
+
+def test_weekday_ranges_wrap_around_the_week():
+    window = SendWindow("09:00", "17:00", "fri-mon")
+    assert window.days == {4, 5, 6, 0}
+    assert SendWindow("09:00", "17:00", ["sat", "sun"]).days == {5, 6}
+
+
+def test_invalid_windows_are_rejected():
+    with pytest.raises(ValueError):
+        SendWindow("09:00", "09:00")
+    with pytest.raises(ValueError):
+        SendWindow("9am", "17:00")
+    with pytest.raises(ValueError):
+        SendWindow("09:00", "17:00", "weekdays")
+    with pytest.raises(ValueError):
+        SendWindow.from_dict({"start": "09:00"})
+
+
+def test_campaign_waits_for_its_window():
+    window = SendWindow("09:00", "17:00", "mon-fri")
+    campaign = Campaign(["1"], "m", windows=[window])
+    saturday = local(2024, 5, 11, 10, 0)
+    assert campaign.ready_at(saturday) == local(2024, 5, 13, 9, 0)
+    campaign.deadline = local(2024, 5, 12, 0, 0)
+    assert campaign.ready_at(saturday) is None
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import WebDriverException
+from sender_core import CampaignSender, OUTCOME_COMPLETED
+from send_queue import Campaign, SendScheduler
+from session_recycler import RecyclePolicy
+
+
+class HealthyDriver:
+    def execute_script(self, script, *args):
+        return "healthy"
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def sender(tmp_path):
+    return CampaignSender(["+14155550101"], "Hello", None, "Chrome", 0, str(tmp_path),
+                          screenshot_dir=str(tmp_path / "screenshots"))
+
+
+def test_send_with_a_dead_driver_fails_the_contact(sender, dead_driver):
+    sender.driver = dead_driver
+    result = sender.send("+14155550101", "Hello")
+    assert result["status"] == "Failed"
+    assert result["step"] == "navigate"
+    # The session is to blame, so the contact is retried after recovery
+    assert sender.session_failed(result)
+
+
+def test_send_without_a_driver_fails_the_contact(sender):
+    result = sender.send("+14155550101", "Hello")
+    assert result["status"] == "Failed"
+
+
+def test_close_session_with_a_dead_driver(sender, dead_driver):
+    sender.driver = dead_driver
+    sender.close_session()
+    assert sender.driver is None
+
+
+def test_failed_driver_restart_is_repaired_before_the_next_send(tmp_path, monkeypatch):
+    scheduler = SendScheduler(close_when_idle=True)
+    sender = CampaignSender([], "", None, "Chrome", 0, str(tmp_path), stall_timeout=0, scheduler=scheduler,
+                            recycle_policy=RecyclePolicy(max_contacts=1, max_tab_recycles=0))
+    sender.enqueue(Campaign(["+14155550101", "+14155550102"], "Hello"))
+    starts = []
+
+    def open_session():
+        starts.append(sender.driver)
+        if len(starts) == 2:
+            # The recycle's restart
+            raise WebDriverException("chromedriver failed to start")
+        sender.driver = HealthyDriver()
+        sender.recycler.reset()
+        return True
+
+    sent_with = []
+
+    def send(number, message, attached_file=None, check_chat=False):
+        sent_with.append(sender.driver)
+        sender.recycler.contact_done(1.0, True)
+        return {"number": number, "status": "Success", "reason": ""}
+
+    monkeypatch.setattr(sender, "open_session", open_session)
+    monkeypatch.setattr(sender, "send", send)
+    sender.run()
+    assert sender.outcome == OUTCOME_COMPLETED
+    assert len(starts) == 3
+    assert len(sent_with) == 2 and None not in sent_with
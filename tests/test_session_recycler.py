@@ -0,0 +1,30 @@
+import pytest
+from session_recycler import RecyclePolicy, SessionRecycler, RECYCLE_TAB
+
+
+def test_policy_from_dict_converts_numbers():
+    policy = RecyclePolicy.from_dict({"max_contacts": "3", "max_heap_mb": 512, "max_rss_mb": None})
+    assert policy.max_contacts == 3
+    assert policy.max_heap_mb == 512.0
+    assert policy.max_rss_mb is None
+
+    recycler = SessionRecycler(policy)
+    for _ in range(3):
+        recycler.contact_done(1.0, True)
+    action, _ = recycler.check(None)
+    assert action == RECYCLE_TAB
+
+
+@pytest.mark.parametrize("spec", [
+    {"max_contacts": "400 contacts"},
+    {"max_contacts": True},
+    {"max_heap_mb": [512]},
+    {"window": 0},
+    {"window": None},
+    {"max_nodes": -1},
+    {"max_memory": 1},
+    ["max_contacts"],
+])
+def test_policy_from_dict_rejects_bad_settings(spec):
+    with pytest.raises(ValueError):
+        RecyclePolicy.from_dict(spec)
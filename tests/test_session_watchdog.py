@@ -0,0 +1,14 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from session_watchdog import probe_session, force_close, DEAD
+
+
+def test_probe_reports_a_dead_driver(dead_driver):
+    assert probe_session(None) == DEAD
+    assert probe_session(dead_driver) == DEAD
+
+
+def test_force_close_ignores_a_dead_driver(dead_driver):
+    force_close(dead_driver, timeout=1)
@@ -0,0 +1,71 @@
+import time
+import pytest
+
+pytest.importorskip("phonenumbers")
+
+from suppression import SuppressionIndex, REASON_SENT, REASON_OPT_OUT, REASON_NOT_REGISTERED
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SuppressionIndex(str(tmp_path / "suppression.db"), expected_entries=1000)
+    yield index
+    index.close()
+
+
+def test_filter_splits_the_list(index):
+    index.add(["+14155550101"], REASON_SENT)
+    index.add(["+14155550102"], REASON_OPT_OUT)
+    result = index.filter(["+1 415 555 0101", "+14155550102", "+14155550103", "0014155550103", "nonsense"])
+    assert result.kept == ["+14155550103"]
+    assert result.suppressed == [("+1 415 555 0101", REASON_SENT), ("+14155550102", REASON_OPT_OUT)]
+    assert result.duplicates == ["0014155550103"]
+    assert result.invalid == ["nonsense"]
+
+
+def test_ignore_reasons_and_opt_out_is_kept(index):
+    index.add(["+14155550101"], REASON_SENT)
+    index.add(["+14155550102"], REASON_OPT_OUT)
+    index.add(["+14155550102"], REASON_SENT)
+    result = index.filter(["+14155550101", "+14155550102"], ignore_reasons=(REASON_SENT,))
+    assert result.kept == ["+14155550101"]
+    assert result.suppressed == [("+14155550102", REASON_OPT_OUT)]
+
+
+def test_not_registered_entries_expire(tmp_path):
+    index = SuppressionIndex(str(tmp_path / "suppression.db"), expected_entries=1000, not_registered_ttl=60)
+    index.add(["+14155550101"], REASON_NOT_REGISTERED)
+    index.conn.execute("UPDATE suppressed SET updated_at = ?", (time.time() - 120,))
+    index.conn.commit()
+    assert index.filter(["+14155550101"]).kept == ["+14155550101"]
+    index.close()
+
+
+def test_remove(index):
+    index.add(["+14155550101"], REASON_SENT)
+    index.remove(["+14155550101"])
+    assert index.filter(["+14155550101"]).kept == ["+14155550101"]
+    assert len(index) == 0
+
+
+def test_rows_from_another_process_are_seen(tmp_path):
+    path = str(tmp_path / "suppression.db")
+    reader = SuppressionIndex(path, expected_entries=1000)
+    writer = SuppressionIndex(path, expected_entries=1000)
+    assert reader.filter(["+14155550101"]).kept == ["+14155550101"]
+    writer.add(["+14155550101"], REASON_SENT)
+    assert reader.filter(["+14155550101"]).suppressed == [("+14155550101", REASON_SENT)]
+    assert 14155550101 in reader.bloom
+    writer.close()
+    reader.close()
+
+
+def test_saved_filter_is_reused(tmp_path):
+    path = str(tmp_path / "suppression.db")
+    index = SuppressionIndex(path, expected_entries=1000)
+    index.add(["+14155550101"], REASON_SENT)
+    index.close()
+    reopened = SuppressionIndex(path, expected_entries=1000)
+    assert 14155550101 in reopened.bloom
+    assert reopened.filter(["+14155550101"]).kept == []
+    reopened.close()
@@ -0,0 +1,129 @@
+"""Per-step wait timeouts learned from observed latencies.
+
+Each step keeps a window of recent latencies; its timeout is a high
+percentile of that window times a safety factor, clamped to a floor and a
+ceiling. Until a step has enough samples it uses its original fixed value.
+Optional popup probes are skipped when the popup has not shown up lately,
+with an occasional probe so a popup that comes back is noticed.
+"""
+import os
+import json
+import logging
+import threading
+from collections import deque
+
+# step: (default, floor, ceiling) in seconds
+STEP_LIMITS = {
+    "startup": (60, 10, 120),           # QR code or chat list after opening WhatsApp Web
+    "open_chat": (30, 3, 60),           # chat, invalid-number dialog or continue prompt
+    "chat_load": (30, 2, 60),
+    "compose_ready": (15, 2, 30),
+    "attach": (10, 2, 30),
+    "send": (10, 2, 30),
+    "verify": (15, 3, 45),
+    "popup_notification": (3, 0.5, 5),
+    "popup_dialog": (3, 0.5, 5),
+}
+# Recorded for estimates only, never used as a wait timeout
+HISTORY_STEPS = ("contact",)   # one contact from navigation to verified delivery, without pacing
+
+
+class AdaptiveTimeouts:
+    def __init__(self, path=None, percentile=0.95, safety_factor=2.0, window=200,
+                 min_samples=20, popup_memory=50, probe_every=25):
+        self.path = path
+        self.percentile = percentile
+        self.safety_factor = safety_factor
+        self.window = window
+        self.min_samples = min_samples
+        self.popup_memory = popup_memory
+        self.probe_every = probe_every
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._cache = {}
+        # step -> [probes since last seen, total probes requested]
+        self._popups = {}
+        if path:
+            self.load()
+
+    def timeout(self, step):
+        with self._lock:
+            cached = self._cache.get(step)
+            if cached is not None:
+                return cached
+            default, floor, ceiling = STEP_LIMITS[step]
+            samples = self._samples.get(step)
+            if not samples or len(samples) < self.min_samples:
+                value = default
+            else:
+                ordered = sorted(samples)
+                high = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+                value = min(ceiling, max(floor, high * self.safety_factor))
+            self._cache[step] = value
+            return value
+
+    def observe(self, step, seconds):
+        with self._lock:
+            samples = self._samples.get(step)
+            if samples is None:
+                samples = self._samples[step] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._cache.pop(step, None)
+
+    def typical(self, step):
+        """Median observed latency for `step`, or None without enough samples."""
+        with self._lock:
+            samples = self._samples.get(step)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+            return ordered[len(ordered) // 2]
+
+    def timed_out(self, step):
+        """Counts a timeout as a sample at the limit that was hit, so a slow
+        network pushes the timeout up instead of failing every contact."""
+        self.observe(step, self.timeout(step))
+
+    def should_probe(self, step):
+        """Whether an optional popup check is worth its wait right now."""
+        with self._lock:
+            state = self._popups.setdefault(step, [0, 0])
+            state[1] += 1
+            return state[0] < self.popup_memory or state[1] % self.probe_every == 0
+
+    def popup_result(self, step, seen):
+        with self._lock:
+            state = self._popups.setdefault(step, [0, 0])
+            state[0] = 0 if seen else state[0] + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "steps": {step: list(samples) for step, samples in self._samples.items()},
+                "popups": {step: state[0] for step, state in self._popups.items()}
+            }
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable timeouts file {self.path}: {e}")
+            return
+        with self._lock:
+            for step, samples in data.get("steps", {}).items():
+                if step in STEP_LIMITS or step in HISTORY_STEPS:
+                    self._samples[step] = deque(samples, maxlen=self.window)
+            for step, misses in data.get("popups", {}).items():
+                self._popups[step] = [misses, 0]
+            self._cache.clear()
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, self.path)
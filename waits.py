@@ -0,0 +1,87 @@
+"""DOM waits that resolve on the mutation that satisfies them.
+
+WebDriverWait polls: every check is an HTTP round trip to the driver, and
+a condition met just after a poll is only noticed on the next one. Here a
+single execute_async_script call installs a MutationObserver that checks
+the conditions whenever the page changes and calls back as soon as one
+holds, so the driver blocks on one request and wakes up immediately.
+
+A condition is [name, xpath, mode] where mode is "present" (default),
+"visible" or "absent". Conditions are checked in order and the first one
+that holds wins, which lets one wait race e.g. a chat against an
+invalid-number dialog.
+"""
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+PRESENT = "present"
+VISIBLE = "visible"
+ABSENT = "absent"
+
+# Resolves with [name, node] for the first condition that holds, or null on timeout
+WAIT_FOR_JS = """
+var conditions = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+var settled = false, observer = null, timer = null;
+function find(xpath) {
+    return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function check() {
+    for (var i = 0; i < conditions.length; i++) {
+        var node = find(conditions[i][1]), mode = conditions[i][2] || "present";
+        if (mode === "absent") {
+            if (!node) { return [conditions[i][0], null]; }
+        } else if (node && (mode !== "visible" || node.getClientRects().length > 0)) {
+            return [conditions[i][0], node];
+        }
+    }
+    return null;
+}
+function settle(value) {
+    if (settled) { return; }
+    settled = true;
+    if (observer) { observer.disconnect(); }
+    if (timer) { clearTimeout(timer); }
+    done(value);
+}
+var first = check();
+if (first) { settle(first); return; }
+observer = new MutationObserver(function () {
+    var match = check();
+    if (match) { settle(match); }
+});
+observer.observe(document.documentElement || document, {
+    childList: true, subtree: true, attributes: true, characterData: true
+});
+timer = setTimeout(function () { settle(null); }, timeoutMs);
+"""
+
+# Slack on top of the in-page timeout so the page, not WebDriver, times out first
+SCRIPT_TIMEOUT_MARGIN = 5
+
+
+class DomWaiter:
+    def __init__(self, driver):
+        self.driver = driver
+        self._script_timeout = None
+
+    def first(self, conditions, timeout):
+        """Blocks until one of `conditions` holds and returns (name, element).
+
+        element is None for "absent" conditions. Raises TimeoutException
+        when none holds within `timeout` seconds.
+        """
+        limit = timeout + SCRIPT_TIMEOUT_MARGIN
+        if self._script_timeout != limit:
+            self.driver.set_script_timeout(limit)
+            self._script_timeout = limit
+        try:
+            match = self.driver.execute_async_script(WAIT_FOR_JS, conditions, int(timeout * 1000))
+        except JavascriptException:
+            # The document was replaced mid-wait (navigation); observe the new one
+            match = self.driver.execute_async_script(WAIT_FOR_JS, conditions, int(timeout * 1000))
+        if not match:
+            raise TimeoutException(f"None of {[c[0] for c in conditions]} within {timeout:.1f}s")
+        return match[0], match[1]
+
+    def until(self, xpath, timeout, mode=PRESENT):
+        """Waits for one condition and returns its element (None for ABSENT)."""
+        return self.first([["match", xpath, mode]], timeout)[1]